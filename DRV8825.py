@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import argparse
+
+import motion_script
+import sim_lgpio
+from stepper import StepperDriver, MotorDir, ControlMode, estop
+
+
+class DRV8825(StepperDriver):
+    """DRV8825 on lgpio; dir/enable/mode pins are written as one lgpio group"""
+    disable_after_move = True
+
+    def __init__(self, dir_pin, step_pin, enable_pin, mode_pins, min_position=None, max_position=None,
+                 gpio=None, backend='lgpio'):
+        super().__init__(dir_pin, step_pin, enable_pin, mode_pins, backend=backend,
+                         min_position=min_position, max_position=max_position, gpio=gpio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DRV8825 stepper demo")
+    parser.add_argument('--script', help="run a motion script (see motion_script.py) instead of prompting")
+    parser.add_argument('--log', help="with --script, write per-move timings to this CSV file")
+    parser.add_argument('--quiet', action='store_true', help="with --script, only print the summary")
+    args = parser.parse_args()
+    program = None
+    if args.script:
+        try:
+            program = motion_script.load(args.script)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+
+    sim_lgpio.install_from_env()  # GANTRY_SIM=1 runs the demo on the gantry simulator
+
+    # Initialize motor - change these pins to match your wiring
+    motor = DRV8825(
+        dir_pin=13,     # Direction pin
+        step_pin=19,    # Step pin
+        enable_pin=12,  # Enable pin
+        mode_pins=(16, 5, 20)  # Microstep mode pins
+    )
+    
+    try:
+        # Set microstepping mode (1/8 step for smoother movement)
+        motor.SetMicroStep('softward', '1/8step')
+        
+        if program is not None:
+            run_script(motor, program, args.log, not args.quiet)
+            return
+        
+        print("Stepper motor control demo")
+        print("Commands:")
+        print("  f - move forward")
+        print("  b - move backward")
+        print("  s - stop motor (also mid-move)")
+        print("  q - quit")
+        
+        # Moves run on the motor's motion thread, so 's' can stop one early
+        while True:
+            cmd = input("Enter command: ").lower()
+            
+            if cmd == 'f':
+                steps = int(input("Enter number of steps: "))
+                motor.move_async(steps, stepdelay=0.005)
+            elif cmd == 'b':
+                steps = int(input("Enter number of steps: "))
+                motor.move_async(-steps, stepdelay=0.005)
+            elif cmd == 's':
+                motor.halt()
+                motor.motion.submit(lambda: None).wait()
+                print(f"Motor stopped at position {motor.current_position}")
+            elif cmd == 'q':
+                print("Exiting...")
+                break
+            else:
+                print("Invalid command")
+                
+    except KeyboardInterrupt:
+        estop.trigger()
+        print("\nProgram interrupted")
+    finally:
+        motor.cleanup()
+        print("GPIO cleaned up")
+
+def run_script(motor, program, log_path=None, verbose=True):
+    """Run a parsed motion script back to back and print per-command timing stats"""
+    runner = motion_script.ScriptRunner(motor, log_path, verbose)
+    try:
+        runner.run(program)
+    finally:
+        # Also after Ctrl-C, so an interrupted endurance run still reports
+        print(f"{runner.moves} moves, position {motor.current_position}")
+        print(runner.stats.summary())
+        runner.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,107 +1,11 @@
-import gpiozero as GPIO
-import time
+from stepper import StepperDriver, MotorDir, ControlMode
 
-MotorDir = [
-    'forward',
-    'backward',
-]
 
-ControlMode = [
-    'hardward',
-    'softward',
-]
-
-class HR8825():
-    def __init__(self, dir_pin, step_pin, enable_pin, mode_pins):
-
-        
-        self.mode_pins = mode_pins
-        self.dir_pin = dir_pin
-        self.enable_pin = enable_pin
-        self.step_pin = step_pin
-        
-        self.dir = GPIO.LED(self.dir_pin)
-        self.step = GPIO.LED(self.step_pin)        
-        self.enable = GPIO.LED(self.enable_pin)
-        self.mode_1 = GPIO.LED(self.mode_pins[0])
-        self.mode_2 = GPIO.LED(self.mode_pins[1])
-        self.mode_3 = GPIO.LED(self.mode_pins[2])
-        
-        #GPIO.setmode(GPIO.BCM)
-        #GPIO.setwarnings(False)
-        #GPIO.setup(self.dir_pin, GPIO.OUT)
-        #GPIO.setup(self.step_pin, GPIO.OUT)
-        #GPIO.setup(self.enable_pin, GPIO.OUT)
-        #GPIO.setup(self.mode_pins, GPIO.OUT)
-        self.control_pin = {
-          dir_pin: self.dir,
-          enable_pin: self.enable,
-          step_pin: self.step,
-          mode_pins[0]: self.mode_1,
-          mode_pins[1]: self.mode_2,
-          mode_pins[2]: self.mode_3
-        }
-        
-    def digital_write(self, pin, value):
-        if value:
-          self.control_pin[pin].on()
-        else:
-          self.control_pin[pin].off()
-          
-        #GPIO.output(pin, value)
-        
-    def Stop(self):
-        self.digital_write(self.enable_pin, 0)
-        
-    def Configure_mode(self, microstep):
-        j = 0
-        for i in microstep:
-          self.digital_write(self.mode_pins[j], i)
-          j = j+1
-    
-    def SetMicroStep(self, mode, stepformat):
-        """
-        (1) mode
-            'hardward' :    Use the switch on the module to control the microstep
-            'software' :    Use software to control microstep pin levels
-                Need to put the All switch to 0
-        (2) stepformat
-            ('fullstep', 'halfstep', '1/4step', '1/8step', '1/16step', '1/32step')
-        """
-        microstep = {'fullstep': (0, 0, 0),
-                     'halfstep': (1, 0, 0),
-                     '1/4step': (0, 1, 0),
-                     '1/8step': (1, 1, 0),
-                     '1/16step': (0, 0, 1),
-                     '1/32step': (1, 0, 1)}
-
-        print("Control mode:",mode)
-        if (mode == ControlMode[1]):
-            print("set pins")
-            #self.digital_write(self.mode_pins, microstep[stepformat])
-            self.Configure_mode(microstep[stepformat])
-        
-    def TurnStep(self, Dir, steps, stepdelay=0.005):
-        if (Dir == MotorDir[0]):
-            print("forward")
-            self.digital_write(self.enable_pin, 1)
-            self.digital_write(self.dir_pin, 0)
-        elif (Dir == MotorDir[1]):
-            print("backward")
-            self.digital_write(self.enable_pin, 1)
-            self.digital_write(self.dir_pin, 1)
-        else:
-            print("the dir must be : 'forward' or 'backward'")
-            self.digital_write(self.enable_pin, 0)
-            return
-
-        if (steps == 0):
-            return
-            
-        print("turn step:",steps)
-        for i in range(steps):
-            self.digital_write(self.step_pin, True)
-            time.sleep(stepdelay)
-            self.digital_write(self.step_pin, False)
-            time.sleep(stepdelay)
+class HR8825(StepperDriver):
+    # Keep holding torque between moves, as this board always has
+    disable_after_move = False
 
+    def __init__(self, dir_pin, step_pin, enable_pin, mode_pins, min_position=None, max_position=None,
+                 backend='gpiozero', gpio=None):
+        super().__init__(dir_pin, step_pin, enable_pin, mode_pins, backend=backend,
+                         min_position=min_position, max_position=max_position, gpio=gpio)
@@ -8,6 +8,7 @@ from PIL import Image, ImageTk, ImageSequence
 import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
+import os
 import threading
 import time
 from flask import Flask, send_from_directory
@@ -15,11 +16,20 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
+import sim_lgpio
+sim_lgpio.install_from_env()  # GANTRY_SIM=1: simulated gantry in place of lgpio
 import lgpio
 from ultralytics import YOLO
 import webbrowser
 from fpdf import FPDF
 from DRV8825 import DRV8825
+import stepper
+from servo import StableServo
+from servo_pwm import setup_servo_pins
+from pose import go_to_pose
+import tracking
+from camera_settle import wait_for_settle_async
+import realtime
 
 # Initialize GPIO
 h = lgpio.gpiochip_open(0)
@@ -28,34 +38,24 @@ h = lgpio.gpiochip_open(0)
 SERVO_X_PIN = 17  # BCM 17 for pan servo
 SERVO_Y_PIN = 27  # BCM 27 for tilt servo
 
-# Claim pins as outputs for servo PWM
-lgpio.gpio_claim_output(h, SERVO_X_PIN)
-lgpio.gpio_claim_output(h, SERVO_Y_PIN)
+# Every pin the MotorX/MotorY drivers below use
+STEPPER_PINS = (13, 19, 25, 16, 5, 20, 24, 18, 23, 21, 22, 6)
 
-class StableServo:
-    def __init__(self, pin, min_angle=-90, max_angle=90):
-        self.pin = pin
-        self.min_angle = min_angle
-        self.max_angle = max_angle
-        self.current_angle = 0
-    
-    def move_to_angle(self, angle):
-        """Move to specified angle (-90 to 90) and then detach servo signal"""
-        angle = max(self.min_angle, min(self.max_angle, angle))
-        # Convert angle (-90 to 90) to pulse width (1000-2000Î¼s)
-        pulsewidth = int(1500 + (angle / 90.0) * 500)  # 1000-2000Î¼s
-        lgpio.tx_servo(h, self.pin, pulsewidth)  # Attach and move servo
-        time.sleep(0.3)  # Allow time to reach position
-        lgpio.tx_servo(h, self.pin, 0)  # Detach servo (stop PWM signal)
-        self.current_angle = angle
-        
-    def close(self):
-        """Stop servo signal"""
-        lgpio.tx_servo(h, self.pin, 0)
+# SERVO_BACKEND=sysfs: kernel PWM on SERVO_PWM_PINS, after rewiring (servo_pwm.py)
+SERVO_BACKEND, (SERVO_X_PIN, SERVO_Y_PIN) = setup_servo_pins(lgpio, h, (SERVO_X_PIN, SERVO_Y_PIN), STEPPER_PINS)
 
-# Initialize servos with stable control
-servo_x = StableServo(SERVO_X_PIN)
-servo_y = StableServo(SERVO_Y_PIN)
+# Ramped servo moves do not jolt the camera on big preset changes (preset 1
+# to 12 swings tilt by 145 degrees), so the image settles sooner. Captures
+# wait for the camera to see a steady image (camera_settle.py), for at most
+# CAPTURE_SETTLE_TIMEOUT seconds
+SERVO_RAMP = True
+CAPTURE_SETTLE_TIMEOUT = 1.0 if SERVO_RAMP else 3.0
+
+# Initialize servos
+servo_x = StableServo(SERVO_X_PIN, h, min_angle=-90, max_angle=90, min_pulse=1000, max_pulse=2000,
+                      ramp=SERVO_RAMP, backend=SERVO_BACKEND)
+servo_y = StableServo(SERVO_Y_PIN, h, min_angle=-90, max_angle=90, min_pulse=1000, max_pulse=2000,
+                      ramp=SERVO_RAMP, backend=SERVO_BACKEND)
 # Initialize PiGPIO
 # Device.pin_factory = PiGPIOFactory()
 class ReportServer:
@@ -84,88 +84,6 @@ class ReportServer:
             self.server_thread.join(timeout=1)
             
             
-# Custom DRV8825 class (from your working code)
-
-MotorDir = [
-    'forward',
-    'backward',
-]
-
-ControlMode = [
-    'hardward',
-    'softward',
-]
-class DRV8825:
-    def __init__(self, dir_pin, step_pin, enable_pin, mode_pins):
-        self.dir_pin = dir_pin
-        self.step_pin = step_pin        
-        self.enable_pin = enable_pin
-        self.mode_pins = mode_pins if isinstance(mode_pins, (list, tuple)) else [mode_pins]
-
-        self.h = lgpio.gpiochip_open(0)
-
-        # Claim all pins as outputs
-        lgpio.gpio_claim_output(self.h, self.dir_pin)
-        lgpio.gpio_claim_output(self.h, self.step_pin)
-        lgpio.gpio_claim_output(self.h, self.enable_pin)
-        for pin in self.mode_pins:
-            lgpio.gpio_claim_output(self.h, pin)
-
-    def digital_write(self, pin, value):
-        lgpio.gpio_write(self.h, pin, value)
-
-    def Stop(self):
-        self.digital_write(self.enable_pin, 0)
-
-    def SetMicroStep(self, mode, stepformat):
-        """
-        (1) mode
-            'hardward' : Use DIP switch
-            'softward' : Use GPIOs to control microstepping
-        (2) stepformat: e.g. 'fullstep', 'halfstep', etc.
-        """
-        microstep = {
-            'fullstep': (0, 0, 0),
-            'halfstep': (1, 0, 0),
-            '1/4step': (0, 1, 0),
-            '1/8step': (1, 1, 0),
-            '1/16step': (0, 0, 1),
-            '1/32step': (1, 0, 1)
-        }
-
-        if mode == ControlMode[1]:  # software
-            values = microstep.get(stepformat)
-            if values and len(values) == len(self.mode_pins):
-                for pin, val in zip(self.mode_pins, values):
-                    self.digital_write(pin, val)
-            else:
-                print("Invalid step format or mode pin count mismatch.")
-
-    def TurnStep(self, Dir, steps, stepdelay=0.005):
-        if Dir == MotorDir[0]:  # forward
-            print("turn shaft forward")
-            self.digital_write(self.enable_pin, 1)
-            self.digital_write(self.dir_pin, 0)
-        elif Dir == MotorDir[1]:  # backward
-            print("turn shaft backward")
-            self.digital_write(self.enable_pin, 1)
-            self.digital_write(self.dir_pin, 1)
-        else:
-            print("Direction must be 'forward' or 'backward'")
-            self.digital_write(self.enable_pin, 0)
-            return
-
-        print("turn step:", steps)
-        for _ in range(steps):
-            self.digital_write(self.step_pin, 1)
-            time.sleep(stepdelay)
-            self.digital_write(self.step_pin, 0)
-            time.sleep(stepdelay)
-
-    def cleanup(self):
-        # Optionally disable motor and close chip
-        self.Stop()
-        lgpio.gpiochip_close(self.h)
 # Initialize motor drivers
 MotorX = DRV8825(
     dir_pin=13,     # STEPPER_X_DIR
@@ -180,6 +98,12 @@ MotorY = DRV8825(
     enable_pin=23,
     mode_pins=(21, 22, 6)
 )
+
+# Per-axis driver settings (stepper.CONFIG_FILE)
+stepper.load_config(stepper.CONFIG_FILE, {'x': MotorX, 'y': MotorY, 'servo_x': servo_x, 'servo_y': servo_y})
+
+realtime.enable_from_env({'X': MotorX, 'Y': MotorY})  # STEPPER_REALTIME=1
+
 # Load Haar cascades for face and mouth detection
 face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 mouth_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_smile.xml')
@@ -445,6 +369,12 @@ class ImageCaptureApp:
         self.next_capture_time = 0
         self.current_servo_positions = {'x': 0, 'y': 0}
         self._camera_running = True
+        # An auto-capture is moving or settling; the settle thread reads the camera
+        self.capturing = False
+        self.settling = False
+
+        # Face/mouth tracking corrections and their calibration (tracking.py)
+        self.tracker = tracking.Tracker(MotorX, MotorY, servo_x, servo_y)
         
         # Constants for UI
         self.IMAGE_WIDTH = 300
@@ -645,10 +575,12 @@ class ImageCaptureApp:
                                   font=("times new roman", 14), bg="white", fg="black")
         self.timer_label.pack(side=tk.RIGHT, padx=10)
     def reset_servos(self):  # Proper instance method definition
-        """Reset servos to center position"""
-        servo_x.move_to_angle(0)
-        servo_y.move_to_angle(0)
+        """Start both servos back to center together; returns the PoseMove"""
         self.current_servo_positions = {'x': 0, 'y': 0}
+        return go_to_pose({
+            'servo_x': lambda: servo_x.move_to_async(0),
+            'servo_y': lambda: servo_y.move_to_async(0),
+        }, name='reset')
     def setup_control_buttons(self):
         """Set up the control buttons at the bottom"""
         self.button_frame = tk.Frame(self.right_frame, bg="white")
@@ -677,6 +609,12 @@ class ImageCaptureApp:
                                            bg="orange", fg="white", bd=0)
         self.auto_capture_button.pack(side=tk.LEFT, padx=20)
         
+        self.calibrate_button = tk.Button(self.button_frame, text="Calibrate Tracking",
+                                        command=self.calibrate_tracking,
+                                        font=("times new roman", 16, 'bold'),
+                                        bg="gray", fg="white", bd=0)
+        self.calibrate_button.pack(side=tk.LEFT, padx=20)
+        
         # Analysis button (hidden until all images are captured)
         self.analysis_button = tk.Button(self.button_frame, text="Analyze Results", 
                                        command=self.show_analysis,
@@ -773,17 +711,23 @@ class ImageCaptureApp:
     
 
     def move_to_position(self, index=None):
-        """Move servos to predefined position for current or specified index"""
+        """Start the servos to the predefined position for current or specified index.
+
+        Returns the PoseMove, or None for an unknown index.
+        """
         if index is None:
             index = self.current_image_index
         
         if 0 <= index < len(SERVO_POSITIONS):
             target_pos = SERVO_POSITIONS[index]
-            servo_x.move_to_angle(target_pos['x'])
-            servo_y.move_to_angle(target_pos['y'])
+            # Pan and tilt together; done when the slower one is
+            pose = go_to_pose({
+                'servo_x': lambda: servo_x.move_to_async(target_pos['x']),
+                'servo_y': lambda: servo_y.move_to_async(target_pos['y']),
+            }, name=f"preset {index + 1}")
             self.current_servo_positions = target_pos.copy()
-            return True
-        return False
+            return pose
+        return None
 
     def update_timer_display(self):
         """Update the auto-capture timer display"""
@@ -897,7 +841,14 @@ class ImageCaptureApp:
         popup.grab_set()
 
     def auto_capture_image(self):
-        """Automatically capture image at predefined position"""
+        """Automatically capture image at predefined position.
+
+        Starts the move and returns; capture_at_position() takes the picture
+        from the Tk main loop once the servos have arrived and the camera has
+        settled, so the UI keeps running meanwhile.
+        """
+        if self.capturing:
+            return  # the last capture is still moving or settling
         try:
             # Move to predefined position for this image
             if self.current_image_index + 1 < len(self.image_list):
@@ -913,12 +864,31 @@ class ImageCaptureApp:
                     self.cap.release()
                 self.update_timer_display()
                 self.show_analysis()
-            if not self.move_to_position():
+            pose = self.move_to_position()
+            if pose is None:
                 messagebox.showerror("Error", "Invalid position for auto-capture")
                 return
+            self.capturing = True
+            pose.add_done_callback(lambda p: self.wait_for_camera_settle(self.capture_at_position),
+                                   root=self.root)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to auto-capture image: {str(e)}")
+
+    def wait_for_camera_settle(self, done):
+        """Read preview frames on a worker thread until motion and auto exposure
+        have settled (or the timeout), then call done() on the Tk main loop"""
+        self.settling = True
+
+        def settled(settle, error):
+            self.settling = False
+            print(settle.report() if error is None else f"Camera settle failed: {error}")
+            self.root.after(0, done)
 
-            time.sleep(1)  # Wait for servos to move
+        wait_for_settle_async(lambda: self.grab_frame(flush=0), settled, timeout=CAPTURE_SETTLE_TIMEOUT)
 
+    def capture_at_position(self):
+        """Take the auto-capture image once the servos and camera are steady"""
+        try:
             ret, frame = self.cap.read()
             if not ret:
                 messagebox.showerror("Error", "Failed to capture image from USB camera.")
@@ -953,6 +923,8 @@ class ImageCaptureApp:
     
         except Exception as e:
             messagebox.showerror("Error", f"Failed to auto-capture image: {str(e)}")
+        finally:
+            self.capturing = False
 
     def save_current_image(self, popup=None, auto_save=False):
         """Save current image to database"""
@@ -1364,44 +1336,21 @@ class ImageCaptureApp:
 
     def adjust_motors(self, offset_x, offset_y, fine_tune=False):
         """Adjust both servos and steppers based on offset"""
-        # Servo adjustments
-        if abs(offset_x) > (10 if fine_tune else 20):
-            adjustment = -1 if offset_x > 0 else 1
-            if fine_tune:
-                adjustment *= 0.5  # Smaller adjustments for fine tuning
-            new_angle_x = max(-90, min(90, servo_x.current_angle + adjustment))
-            servo_x.move_to_angle(new_angle_x)
-            self.current_servo_positions['x'] = new_angle_x
-            
-            # Stepper motor adjustment remains the same
-            steps = int(abs(offset_x)/5)
-            if steps > 0:
-                MotorX.SetMicroStep('software', '1/8step')
-                MotorX.TurnStep(
-                    Dir='forward' if offset_x < 0 else 'backward',
-                    steps=steps,
-                    stepdelay=0.001 if fine_tune else 0.002
-                )
-                MotorX.Stop()
-        
-        if abs(offset_y) > (10 if fine_tune else 20):
-            adjustment = -1 if offset_y > 0 else 1
-            if fine_tune:
-                adjustment *= 0.5  # Smaller adjustments for fine tuning
-            new_angle_y = max(-90, min(90, servo_y.current_angle + adjustment))
-            servo_y.move_to_angle(new_angle_y)
-            self.current_servo_positions['y'] = new_angle_y
-            
-            # Stepper motor adjustment remains the same
-            steps = int(abs(offset_y)/5)
-            if steps > 0:
-                MotorY.SetMicroStep('software', '1/8step')
-                MotorY.TurnStep(
-                    Dir='forward' if offset_y < 0 else 'backward',
-                    steps=steps,
-                    stepdelay=0.001 if fine_tune else 0.002
-                )
-                MotorY.Stop()
+        self.current_servo_positions.update(self.tracker.adjust(offset_x, offset_y, fine_tune))
+
+    def grab_frame(self, flush=3):
+        """Read a fresh frame, dropping the ones buffered while motors moved"""
+        return tracking.grab_frame(self.cap, flush)
+
+    def calibrate_tracking(self):
+        """Calibrate backlash and the image Jacobian on a worker thread, so the UI keeps running"""
+        self.tracker.calibrate(self.grab_frame, lambda error: self.root.after(0, self.calibration_done, error))
+
+    def calibration_done(self, error):
+        if error is None:
+            messagebox.showinfo("Tracking Calibration", "Tracking and backlash calibrated and saved")
+        else:
+            messagebox.showerror("Tracking Calibration", f"Calibration failed: {error}")
 
 
     def update_camera_display(self, imgtk):
@@ -1427,6 +1376,10 @@ class ImageCaptureApp:
     def _update_camera_feed(self):
         """Update camera feed in main thread"""
         if getattr(self, '_camera_running', False):
+            if self.tracker.calibrating or self.settling:
+                # Another thread is reading the camera; just keep the loop alive
+                self.root.after(30, self._update_camera_feed)
+                return
             try:
                 ret, frame = self.cap.read()
                 if ret:
@@ -1545,6 +1498,8 @@ def update_camera_display(self, frame_rgb):
         if hasattr(self, 'cap'):
             self.cap.release()
         
+        self.tracker.close()
+
         # Clean up servos
         servo_x.close()
         servo_y.close()
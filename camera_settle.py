@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Camera settle detection before a capture.
+# Instead of sleeping a fixed time after a move, preview frames are read
+# until the picture is steady: the horn and gantry have stopped shaking the
+# camera (little frame-to-frame difference) and auto exposure has stopped
+# walking the brightness. Frames are shrunk to SETTLE_SIZE grey images, so a
+# check costs a fraction of a millisecond and the wait is set by the camera
+# frame rate.
+
+# Downscaled size the checks run on
+SETTLE_SIZE = (80, 60)
+
+# Mean absolute difference between consecutive frames, in grey levels, with
+# the overall brightness change taken out (sensor noise is about 1)
+SETTLE_MOTION = 2.0
+
+# How far the mean brightness may wander over the quiet frames, in grey levels
+SETTLE_DRIFT = 1.5
+
+# Consecutive quiet frame pairs needed (about 0.1 s at 30 fps)
+SETTLE_FRAMES = 3
+
+# Give up and capture anyway after this many seconds
+SETTLE_TIMEOUT = 3.0
+
+
+def shrink(frame, size=SETTLE_SIZE):
+    """Small float32 grey copy of a camera frame"""
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return np.float32(cv2.resize(frame, size, interpolation=cv2.INTER_AREA))
+
+
+def frame_change(before, after):
+    """(motion, drift) between two shrunk frames.
+
+    drift is the change in mean brightness; motion is the mean absolute
+    difference left once that is taken out, so an exposure step does not
+    look like movement.
+    """
+    diff = after - before
+    drift = float(diff.mean())
+    motion = float(np.abs(diff - drift).mean())
+    return motion, drift
+
+
+class SettleResult:
+    def __init__(self, settled, seconds, frames, motion, drift):
+        self.settled = settled  # False if the timeout ran out first
+        self.seconds = seconds
+        self.frames = frames    # frames read
+        self.motion = motion    # last frame-to-frame motion
+        self.drift = drift      # brightness spread over the last quiet frames
+
+    def report(self):
+        if self.settled:
+            return f"Camera settled in {self.seconds:.2f}s ({self.frames} frames)"
+        return (f"Camera not settled after {self.seconds:.2f}s (motion {self.motion:.1f}, "
+                f"drift {self.drift:.1f}); capturing anyway")
+
+
+def wait_for_settle(grab_frame, timeout=SETTLE_TIMEOUT, motion=SETTLE_MOTION, drift=SETTLE_DRIFT,
+                    quiet_frames=SETTLE_FRAMES, size=SETTLE_SIZE):
+    """Read frames with grab_frame() until the image is steady, or timeout seconds.
+
+    Steady means quiet_frames consecutive frame pairs each move less than
+    motion, with the mean brightness of those frames within drift of each
+    other. Frames buffered during the move are simply read through.
+    Returns a SettleResult.
+    """
+    started = time.monotonic()
+    previous = shrink(grab_frame(), size)
+    means = deque([float(previous.mean())], maxlen=quiet_frames + 1)
+    quiet = 0
+    frames = 1
+    last_motion = spread = 0.0
+    while True:
+        current = shrink(grab_frame(), size)
+        frames += 1
+        last_motion, _ = frame_change(previous, current)
+        means.append(float(current.mean()))
+        quiet = quiet + 1 if last_motion < motion else 0
+        spread = max(means) - min(means)
+        elapsed = time.monotonic() - started
+        if quiet >= quiet_frames and spread < drift:
+            return SettleResult(True, elapsed, frames, last_motion, spread)
+        if elapsed >= timeout:
+            return SettleResult(False, elapsed, frames, last_motion, spread)
+        previous = current
+
+
+def wait_for_settle_async(grab_frame, done, **options):
+    """wait_for_settle on a worker thread, so a UI thread keeps running.
+
+    done(result, error) is called from that thread with the SettleResult,
+    or with None and the exception if reading frames failed. Nothing else
+    may read the camera until then. Returns the thread.
+    """
+    def run():
+        try:
+            result = wait_for_settle(grab_frame, **options)
+        except Exception as e:
+            done(None, e)
+        else:
+            done(result, None)
+
+    thread = threading.Thread(target=run, name='camera-settle', daemon=True)
+    thread.start()
+    return thread
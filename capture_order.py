@@ -0,0 +1,55 @@
+import numpy as np
+
+# Travel-optimised capture ordering.
+# The presets are few enough (13) for an exact shortest open path
+# (Held-Karp dynamic programming over subsets), with move times taken from
+# the planned stepper moves rather than straight-line distance.
+
+
+def transition_times(positions, move_time):
+    """Matrix of move_time(start, target) seconds between every pair of positions"""
+    n = len(positions)
+    cost = np.zeros((n, n))
+    for i in range(n):
+        for j in range(n):
+            if i != j:
+                cost[i, j] = move_time(positions[i], positions[j])
+    return cost
+
+
+def path_time(cost, order):
+    """Total travel time visiting the positions in order"""
+    return float(sum(cost[a, b] for a, b in zip(order, order[1:])))
+
+
+def shortest_order(cost, start=0):
+    """Visit order over all positions that starts at start and has the least travel time"""
+    n = len(cost)
+    others = [i for i in range(n) if i != start]
+    m = len(others)
+    if m == 0:
+        return [start]
+    sub = cost[np.ix_(others, others)]   # between the other positions
+    first = cost[start, others]          # from start to each of them
+    bits = 1 << np.arange(m)
+
+    # best[S, j]: least time from start through the subset S, ending at j
+    best = np.full((1 << m, m), np.inf)
+    came_from = np.full((1 << m, m), -1, dtype=np.int64)
+    best[bits, np.arange(m)] = first
+    for subset in range(1, 1 << m):
+        members = np.flatnonzero(subset & bits)
+        if len(members) < 2:
+            continue
+        # Reach each member j from the best end point of subset without j
+        prev = best[subset ^ bits[members]] + sub[:, members].T
+        came_from[subset, members] = np.argmin(prev, axis=1)
+        best[subset, members] = np.min(prev, axis=1)
+
+    subset = (1 << m) - 1
+    j = int(np.argmin(best[subset]))
+    path = []
+    while j >= 0:
+        path.append(j)
+        subset, j = subset ^ (1 << j), int(came_from[subset, j])
+    return [start] + [others[j] for j in reversed(path)]
@@ -0,0 +1,101 @@
+import os
+import shutil
+import tempfile
+import threading
+
+# A stand-in for /sys/class/pwm, for working on the sysfs servo backend off
+# the Pi. It is a plain directory tree; a watcher thread plays the kernel's
+# part, turning a channel number written to pwmchipN/export into a pwmM/
+# directory (and removing it again on unexport). Pass its root to
+# SysfsPwmOutput or StableServo(pwm_root=...):
+#
+#   with FakePwmSysfs() as sysfs:
+#       servo = StableServo(12, None, backend='sysfs', pwm_root=sysfs.root)
+#       servo.move_to_angle(45)
+#       print(sysfs.state(0, 0))    # {'period': 20000000, 'duty_cycle': 1000000, 'enable': 1}
+
+
+class FakePwmSysfs:
+    def __init__(self, chips=None, poll=0.005):
+        """chips: {chip number: channel count}, default one chip with 2 channels"""
+        self.root = tempfile.mkdtemp(prefix='fake-pwm-')
+        self.chips = dict(chips or {0: 2})
+        self.poll = poll
+        self.exports = []  # (chip, channel, 'export' or 'unexport') in the order seen
+        for chip, npwm in self.chips.items():
+            chip_dir = self._chip_dir(chip)
+            os.makedirs(chip_dir)
+            self._write(os.path.join(chip_dir, 'npwm'), npwm)
+            self._write(os.path.join(chip_dir, 'export'), '')
+            self._write(os.path.join(chip_dir, 'unexport'), '')
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, name='fake-pwm-sysfs', daemon=True)
+        self._thread.start()
+
+    def _chip_dir(self, chip):
+        return os.path.join(self.root, f'pwmchip{chip}')
+
+    @staticmethod
+    def _write(path, value):
+        with open(path, 'w') as f:
+            f.write(f'{value}\n' if value != '' else '')
+
+    @staticmethod
+    def _take(path):
+        """Read and clear a write-only sysfs file"""
+        with open(path, 'r+') as f:
+            value = f.read().strip()
+            if value:
+                f.seek(0)
+                f.truncate()
+        return value
+
+    def _watch(self):
+        while not self._stop.wait(self.poll):
+            self.update()
+
+    def update(self):
+        """Act on pending export/unexport writes (the watcher thread calls this)"""
+        for chip, npwm in self.chips.items():
+            chip_dir = self._chip_dir(chip)
+            for action in ('export', 'unexport'):
+                value = self._take(os.path.join(chip_dir, action))
+                if not value:
+                    continue
+                channel = int(value)
+                if not 0 <= channel < npwm:
+                    continue  # the kernel would fail the write with EINVAL
+                self.exports.append((chip, channel, action))
+                channel_dir = os.path.join(chip_dir, f'pwm{channel}')
+                if action == 'unexport':
+                    shutil.rmtree(channel_dir, ignore_errors=True)
+                elif not os.path.isdir(channel_dir):
+                    os.makedirs(channel_dir + '.tmp')
+                    for name in ('period', 'duty_cycle', 'enable'):
+                        self._write(os.path.join(channel_dir + '.tmp', name), 0)
+                    self._write(os.path.join(channel_dir + '.tmp', 'polarity'), 'normal')
+                    # Appear complete in one go, as the kernel's directory does
+                    os.rename(channel_dir + '.tmp', channel_dir)
+
+    def exported(self, chip, channel):
+        return os.path.isdir(os.path.join(self._chip_dir(chip), f'pwm{channel}'))
+
+    def state(self, chip, channel):
+        """{'period', 'duty_cycle', 'enable'} of an exported channel, as ints"""
+        channel_dir = os.path.join(self._chip_dir(chip), f'pwm{channel}')
+        state = {}
+        for name in ('period', 'duty_cycle', 'enable'):
+            with open(os.path.join(channel_dir, name)) as f:
+                state[name] = int(f.read().strip() or 0)
+        return state
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(1)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
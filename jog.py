@@ -0,0 +1,181 @@
+import math
+import threading
+import time
+
+import motion_thread
+from stepper import ControlMode, MotorDir, estop
+
+# Press-and-hold velocity jogging.
+# While a direction is held the axis speeds up at accel to max_speed; on
+# release (or nearing a limit) it decelerates to a stop. Jogs run on a
+# motion thread, so the Tk loop never waits for them. A release followed
+# by a press within hold_grace counts as still held, which swallows the
+# release/press pairs of keyboard auto-repeat.
+
+
+class VelocityJog:
+    def __init__(self, thread, max_speed, accel, hold_grace=0.1):
+        """thread: MotionThread to run on; max_speed in units/s, accel in units/s^2"""
+        self.thread = thread
+        self.max_speed = max_speed
+        self.accel = accel
+        self.hold_grace = hold_grace
+        self._lock = threading.Lock()
+        self._direction = 0       # held direction: +1, -1, or 0
+        self._released_at = None
+        self._running = False
+        self.cancel = None        # CancelToken of the running jog
+
+    def press(self, direction):
+        """Start or keep jogging in direction (+1 or -1)"""
+        with self._lock:
+            self._direction = direction
+            self._released_at = None
+            if self._running:
+                return
+            self._running = True
+            self.cancel = motion_thread.CancelToken()
+        future = self.thread.submit(self._run, self.cancel)
+        future.cancel_token = self.cancel
+
+    def release(self, direction=None):
+        """Stop jogging (after hold_grace); a direction other than the held one is ignored"""
+        with self._lock:
+            if direction is None or direction == self._direction:
+                self._released_at = time.monotonic()
+
+    def _held(self):
+        with self._lock:
+            if self._released_at is not None and time.monotonic() - self._released_at >= self.hold_grace:
+                self._direction = 0
+                self._released_at = None
+            return self._direction
+
+    def _run(self, cancel):
+        speed = 0.0
+        moving = 0
+        try:
+            while not cancel.cancelled:
+                wanted = self._held()
+                if moving == 0:
+                    if wanted == 0:
+                        with self._lock:
+                            if self._direction == 0:
+                                # Decided under the same lock press() checks,
+                                # so a press from here on starts a new jog
+                                self._running = False
+                                return
+                        continue
+                    if self._room(wanted) < 1:
+                        time.sleep(0.01)  # held against a limit
+                        continue
+                    if not self._begin(wanted, cancel):
+                        return
+                    moving = wanted
+
+                # v^2 changes by 2*accel per unit; brake in time for a limit
+                if wanted == moving and speed ** 2 / (2.0 * self.accel) < self._room(moving):
+                    speed = min(self.max_speed, math.sqrt(speed ** 2 + 2.0 * self.accel))
+                else:
+                    # Speeds come in steps of sqrt(2*accel*k); below k=1 means stopped
+                    squared = speed ** 2 - 2.0 * self.accel
+                    if squared < self.accel:
+                        speed = 0.0
+                        moving = 0
+                        continue
+                    speed = math.sqrt(squared)
+                if not self._step(moving, 1.0 / speed, cancel):
+                    return
+        finally:
+            with self._lock:
+                if self.cancel is cancel:  # not already handed to a newer jog
+                    self._running = False
+            self._end()
+
+    def _room(self, direction):
+        """Units left before the limit in direction"""
+        return math.inf
+
+    def _begin(self, direction, cancel):
+        """Prepare to move in direction; False to give up"""
+        return True
+
+    def _step(self, direction, interval, cancel):
+        """Move one unit taking interval seconds; False to stop"""
+        raise NotImplementedError
+
+    def _end(self):
+        pass
+
+
+class StepperJog(VelocityJog):
+    """Velocity jog for a StepperDriver, on the driver's own motion thread"""
+
+    def __init__(self, driver, max_speed=300, accel=600, hold_grace=0.1):
+        super().__init__(driver.motion, max_speed, accel, hold_grace)
+        self.driver = driver
+
+    def _room(self, direction):
+        driver = self.driver
+        limit = driver.max_position if direction > 0 else driver.min_position
+        if limit is None:
+            return math.inf
+        return abs(limit - driver.current_position)
+
+    def _begin(self, direction, cancel):
+        driver = self.driver
+        if driver._should_stop(cancel):
+            return False
+        if driver.gears is not None:
+            driver.SetMicroStep(ControlMode[1], driver.gears[0])
+        if not driver._enable_direction(MotorDir[0] if direction > 0 else MotorDir[1]):
+            return False
+        driver._journal_begin()
+        driver.take_up_backlash(direction, cancel=cancel)
+        return not driver._should_stop(cancel)
+
+    def _step(self, direction, interval, cancel):
+        driver = self.driver
+        if driver._should_stop(cancel) or self._room(direction) < 1:
+            return False
+        half = interval / 2.0
+        driver.digital_write(driver.step_pin, 1)
+        driver.backend.sleep(half)
+        driver.digital_write(driver.step_pin, 0)
+        driver.backend.sleep(half)
+        driver.current_position += direction
+        return True
+
+    def _end(self):
+        self.driver._journal_end()
+        if self.driver.disable_after_move or estop.active:
+            self.driver.Stop()
+
+
+class ServoJog(VelocityJog):
+    """Velocity jog for a servo in 1-degree units.
+
+    servo needs hold_angle(angle), which moves without detaching, and
+    detach(); the signal is detached once the jog stops.
+    """
+
+    def __init__(self, servo, min_angle, max_angle, max_speed=30, accel=60, hold_grace=0.1):
+        super().__init__(motion_thread.MotionThread(f"servo-jog-{servo.pin}"), max_speed, accel, hold_grace)
+        self.servo = servo
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+
+    def _room(self, direction):
+        if direction > 0:
+            return self.max_angle - self.servo.current_angle
+        return self.servo.current_angle - self.min_angle
+
+    def _step(self, direction, interval, cancel):
+        if self._room(direction) < 1:
+            return False
+        self.servo.hold_angle(self.servo.current_angle + direction)
+        time.sleep(interval)
+        return True
+
+    def _end(self):
+        self.servo.detach()
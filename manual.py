@@ -7,6 +7,8 @@ import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 import time
+import sim_lgpio
+sim_lgpio.install_from_env()  # GANTRY_SIM=1: simulated gantry in place of lgpio
 import lgpio
 import os
 import webbrowser
@@ -18,6 +20,12 @@ from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 from ultralytics import YOLO
 from HR8825 import HR8825
+from servo import StableServo
+from servo_pwm import setup_servo_pins
+from pose import go_to_pose
+import stepper
+from stepper import estop
+from jog import StepperJog, ServoJog
 
 # Initialize GPIO
 h = lgpio.gpiochip_open(0)
@@ -26,46 +34,22 @@ h = lgpio.gpiochip_open(0)
 SERVO_X_PIN = 27  # BCM 17 for pan servo
 SERVO_Y_PIN = 17  # BCM 27 for tilt servo
 
-# Claim pins as outputs for servo PWM
-lgpio.gpio_claim_output(h, SERVO_X_PIN)
-lgpio.gpio_claim_output(h, SERVO_Y_PIN)
+# Every pin the MotorX/MotorY drivers below use
+STEPPER_PINS = (13, 19, 12, 16, 6, 20, 24, 18, 4, 21, 22, 5)
 
-class StableServo:
-    def __init__(self, pin):
-        self.pin = pin
-        self.current_angle = 90
-    
-    def move_to_angle(self, angle):
-        """Move to specified angle (0-180) and then detach servo signal"""
-        angle = max(0, min(180, angle))
-        pulsewidth = int(500 + (angle / 180.0) * 2000)  # 500-2500μs
-        lgpio.tx_servo(h, self.pin, pulsewidth)  # Attach and move servo
-        time.sleep(0.3)  # Allow time to reach position
-        lgpio.tx_servo(h, self.pin, 0)  # Detach servo (stop PWM signal)
-        self.current_angle = angle
-        
-    def close(self):
-        """Stop servo signal"""
-        lgpio.tx_servo(h, self.pin, 0)
-
-# Initialize servos with stable control
-servo_x = StableServo(SERVO_X_PIN)
-servo_y = StableServo(SERVO_Y_PIN)
-
-def move_servo_x(angle_change):
-    """Move servo X by specified angle change"""
-    new_angle = servo_x.current_angle + angle_change
-    servo_x.move_to_angle(new_angle)
+# SERVO_BACKEND=sysfs: kernel PWM on SERVO_PWM_PINS, after rewiring (servo_pwm.py)
+SERVO_BACKEND, (SERVO_X_PIN, SERVO_Y_PIN) = setup_servo_pins(lgpio, h, (SERVO_X_PIN, SERVO_Y_PIN), STEPPER_PINS)
 
-def move_servo_y(angle_change):
-    """Move servo Y by specified angle change"""
-    new_angle = servo_y.current_angle + angle_change
-    servo_y.move_to_angle(new_angle)
+# Initialize servos
+servo_x = StableServo(SERVO_X_PIN, h, backend=SERVO_BACKEND)
+servo_y = StableServo(SERVO_Y_PIN, h, backend=SERVO_BACKEND)
 
 def reset_servos():
-    """Reset servos to center position"""
-    servo_x.move_to_angle(90)
-    servo_y.move_to_angle(90)
+    """Start both servos back to center together; returns the PoseMove"""
+    return go_to_pose({
+        'servo_x': lambda: servo_x.move_to_async(90),
+        'servo_y': lambda: servo_y.move_to_async(90),
+    }, name='reset')
 
 def cleanup_servos():
     """Clean up servo resources"""
@@ -74,12 +58,15 @@ def cleanup_servos():
     lgpio.gpiochip_close(h)
 
 try:
+    # On lgpio, like the DRV8825 rig: dir/enable/mode go out as one group_write
+    # and TurnStepTrain is timed by lgpio (HR8825 defaults to gpiozero)
     # MotorY: Vertical movement (Y-axis)
     MotorY = HR8825(
         dir_pin=13,    # BCM 27 (Physical pin 13)
         step_pin=19,   # BCM 10 (Physical pin 19)
         enable_pin=12, # BCM 18 (Physical pin 12)
-        mode_pins=(16, 6, 20)  # M0, M1, M2 (BCM 16,17,20)
+        mode_pins=(16, 6, 20),  # M0, M1, M2 (BCM 16,17,20)
+        backend='lgpio'
     )
     
     # MotorX: Horizontal movement (X-axis)
@@ -87,32 +74,37 @@ try:
         dir_pin=24,    # BCM 19 (Physical pin 24)
         step_pin=18,   # BCM 24 (Physical pin 18)
         enable_pin=4,  # BCM 23 (Physical pin 16)
-        mode_pins=(21, 22, 5)  # M0, M1, M2 (BCM 21,22,27)
+        mode_pins=(21, 22, 5),  # M0, M1, M2 (BCM 21,22,27)
+        backend='lgpio'
     )
     
     # Set microstepping modes
     MotorX.SetMicroStep('softward', 'fullstep')
     MotorY.SetMicroStep('hardward', 'halfstep')
     
+    # Per-axis driver settings (stepper.CONFIG_FILE)
+    stepper.load_config(stepper.CONFIG_FILE, {'x': MotorX, 'y': MotorY, 'servo_x': servo_x, 'servo_y': servo_y})
+    
 except Exception as e:
     print(f"Motor initialization error: {e}")
     raise
 
-def stepper_move_x(steps):
-    """Move X stepper motor by specified steps"""
-    try:
-        direction = 'forward' if steps > 0 else 'backward'
-        MotorX.TurnStep(Dir=direction, steps=abs(steps), stepdelay=0.005)
-    except Exception as e:
-        print(f"Error moving X stepper: {e}")
+def is_text_input(widget):
+    """True for widgets where arrow keys edit text (Entry, Spinbox, Combobox, Text)"""
+    return isinstance(widget, (tk.Entry, tk.Spinbox, tk.Text))
+
+# Press-and-hold jogging for the control buttons and arrow keys. Speeds are
+# in steps/s (degrees/s for the servos); releasing decelerates to a stop
+stepper_jog_x = StepperJog(MotorX, max_speed=300, accel=600)
+stepper_jog_y = StepperJog(MotorY, max_speed=300, accel=600)
+servo_jog_x = ServoJog(servo_x, 0, 180, max_speed=30, accel=60)
+servo_jog_y = ServoJog(servo_y, 0, 180, max_speed=30, accel=60)
 
-def stepper_move_y(steps):
-    """Move Y stepper motor by specified steps"""
-    try:
-        direction = 'forward' if steps > 0 else 'backward'
-        MotorY.TurnStep(Dir=direction, steps=abs(steps), stepdelay=0.005)
-    except Exception as e:
-        print(f"Error moving Y stepper: {e}")
+def bind_jog(widget, jog, direction):
+    """Jog in direction for as long as widget is held down"""
+    widget.bind('<ButtonPress-1>', lambda e: jog.press(direction))
+    widget.bind('<ButtonRelease-1>', lambda e: jog.release(direction))
+    return widget
 
 class ReportGenerator:
     def __init__(self, patient_id, connection):
@@ -647,12 +639,10 @@ class ImageCaptureApp:
         btn_frame = ttk.Frame(pan_frame)
         btn_frame.pack()
         
-        ttk.Button(btn_frame, text="◄ Left", 
-                  command=lambda: move_servo_x(-10), 
-                  width=8).pack(side=tk.LEFT, padx=2)
-        ttk.Button(btn_frame, text="Right ►", 
-                  command=lambda: move_servo_x(10), 
-                  width=8).pack(side=tk.LEFT, padx=2)
+        bind_jog(ttk.Button(btn_frame, text="◄ Left", width=8), 
+                 servo_jog_x, -1).pack(side=tk.LEFT, padx=2)
+        bind_jog(ttk.Button(btn_frame, text="Right ►", width=8), 
+                 servo_jog_x, 1).pack(side=tk.LEFT, padx=2)
         
         # Tilt (Y-axis) controls
         tilt_frame = ttk.Frame(servo_frame)
@@ -663,12 +653,10 @@ class ImageCaptureApp:
         btn_frame = ttk.Frame(tilt_frame)
         btn_frame.pack()
         
-        ttk.Button(btn_frame, text="▲ Up", 
-                  command=lambda: move_servo_y(-10), 
-                  width=8).pack(side=tk.LEFT, padx=2)
-        ttk.Button(btn_frame, text="▼ Down", 
-                  command=lambda: move_servo_y(10), 
-                  width=8).pack(side=tk.LEFT, padx=2)
+        bind_jog(ttk.Button(btn_frame, text="▲ Up", width=8), 
+                 servo_jog_y, -1).pack(side=tk.LEFT, padx=2)
+        bind_jog(ttk.Button(btn_frame, text="▼ Down", width=8), 
+                 servo_jog_y, 1).pack(side=tk.LEFT, padx=2)
         
         # Reset button
         ttk.Button(servo_frame, text="Reset", 
@@ -683,22 +671,38 @@ class ImageCaptureApp:
         control_grid = ttk.Frame(stepper_frame)
         control_grid.pack(pady=5)
         
-        # Add buttons in a cross pattern
-        ttk.Button(control_grid, text="▲ Up", 
-                  command=lambda: stepper_move_y(-100), 
-                  width=8).grid(row=0, column=1, padx=5, pady=2)
-        ttk.Button(control_grid, text="◄ Left", 
-                  command=lambda: stepper_move_x(-100), 
-                  width=8).grid(row=1, column=0, padx=5, pady=2)
+        # Add buttons in a cross pattern; hold to jog
+        bind_jog(ttk.Button(control_grid, text="▲ Up", width=8), 
+                 stepper_jog_y, -1).grid(row=0, column=1, padx=5, pady=2)
+        bind_jog(ttk.Button(control_grid, text="◄ Left", width=8), 
+                 stepper_jog_x, -1).grid(row=1, column=0, padx=5, pady=2)
         ttk.Button(control_grid, text="Center", 
                   command=reset_servos,
                   width=8).grid(row=1, column=1, padx=5, pady=2)
-        ttk.Button(control_grid, text="Right ►", 
-                  command=lambda: stepper_move_x(100), 
-                  width=8).grid(row=1, column=2, padx=5, pady=2)
-        ttk.Button(control_grid, text="▼ Down", 
-                  command=lambda: stepper_move_y(100), 
-                  width=8).grid(row=2, column=1, padx=5, pady=2)
+        bind_jog(ttk.Button(control_grid, text="Right ►", width=8), 
+                 stepper_jog_x, 1).grid(row=1, column=2, padx=5, pady=2)
+        bind_jog(ttk.Button(control_grid, text="▼ Down", width=8), 
+                 stepper_jog_y, 1).grid(row=2, column=1, padx=5, pady=2)
+        
+        # Emergency stop: the button, or F12 (Esc is taken by leaving fullscreen)
+        tk.Button(stepper_frame, text="E-STOP (F12)", bg='red', fg='white',
+                  activebackground='darkred', font=('Helvetica', 11, 'bold'),
+                  command=self.emergency_stop).pack(fill='x', padx=5, pady=5)
+        self.root.bind('<F12>', self.emergency_stop)
+        
+        # Arrow keys jog the steppers, Shift+arrows the servos. Auto-repeat
+        # sends release/press pairs; the jogs treat those as one long hold.
+        # Arrows typed into a text field stay with the field
+        for key, stepper_jog, servo_jog, direction in (('Left', stepper_jog_x, servo_jog_x, -1),
+                                                       ('Right', stepper_jog_x, servo_jog_x, 1),
+                                                       ('Up', stepper_jog_y, servo_jog_y, -1),
+                                                       ('Down', stepper_jog_y, servo_jog_y, 1)):
+            self.root.bind(f'<KeyPress-{key}>', lambda e, j=stepper_jog, d=direction:
+                           None if is_text_input(e.widget) else j.press(d))
+            self.root.bind(f'<Shift-KeyPress-{key}>', lambda e, j=servo_jog, d=direction:
+                           None if is_text_input(e.widget) else j.press(d))
+            self.root.bind(f'<KeyRelease-{key}>', lambda e, jogs=(stepper_jog, servo_jog), d=direction:
+                           [jog.release(d) for jog in jogs])
         
         # Bottom Controls (Navigation and Capture)
         bottom_frame = ttk.Frame(self.main_container, style='TFrame')
@@ -1221,6 +1225,13 @@ Your Dental Clinic"""
         """Clean up resources and exit"""
         self.cleanup()
         self.root.destroy()
+    def emergency_stop(self, event=None):
+        """Drop both enables at once and cancel every queued move"""
+        latency = estop.trigger()
+        messagebox.showwarning("Emergency Stop",
+                               f"Steppers disabled in {latency * 1000:.1f} ms.\nPress OK to re-arm.")
+        estop.reset()
+
     def cleanup(self):
         """Clean up all resources"""
         self._camera_running = False
@@ -1230,6 +1241,8 @@ Your Dental Clinic"""
             self.cap.release()
         
         # Clean up servos and motors
+        servo_jog_x.thread.cancel_all()
+        servo_jog_y.thread.cancel_all()
         cleanup_servos()
         if 'MotorX' in globals():
             MotorX.cleanup()
@@ -1245,6 +1258,7 @@ if __name__ == "__main__":
     
     def on_closing():
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            # cleanup() cancels a move in progress instead of waiting for it
             app.cleanup()
             root.destroy()
     
@@ -0,0 +1,84 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Motion profiles for the stepper drivers.
+# Speeds are in steps/s and accelerations in steps/s^2 of whatever
+# microstep mode the driver is in.
+
+PROFILE_SHAPES = ['trapezoid', 'scurve']
+
+# Defaults used by TurnStepProfile. 1000 steps/s is 4x the 0.002 stepdelay
+# the preset moves used to run at; 4000 steps/s^2 reaches it in 125 steps.
+DEFAULT_MAX_SPEED = 1000.0
+DEFAULT_ACCEL = 4000.0
+
+
+def _scurve_ramp(max_speed, accel, start_speed, samples=512):
+    """Sampled (distance, velocity) of a sine-squared acceleration ramp.
+
+    accel is the average acceleration, so the ramp covers the same distance
+    as the trapezoid ramp: (v^2 - v0^2) / (2 * accel).
+    """
+    peak_accel = 2.0 * accel
+    duration = 2.0 * (max_speed - start_speed) / peak_accel
+    t = np.linspace(0.0, duration, samples)
+    phase = 2.0 * np.pi * t / duration
+    v = start_speed + peak_accel * (t / 2.0 - duration * np.sin(phase) / (4.0 * np.pi))
+    s = start_speed * t + peak_accel * (t ** 2 / 4.0 + duration ** 2 * (np.cos(phase) - 1.0) / (8.0 * np.pi ** 2))
+    return s, v
+
+
+def _ramp_velocity(s, max_speed, accel, shape, start_speed):
+    """Velocity reached after accelerating from start_speed over distance s"""
+    if shape == 'trapezoid':
+        return np.minimum(max_speed, np.sqrt(start_speed ** 2 + 2.0 * accel * s))
+    if shape == 'scurve':
+        ramp_s, ramp_v = _scurve_ramp(max_speed, accel, start_speed)
+        return np.interp(s, ramp_s, ramp_v, right=max_speed)
+    raise ValueError(f"shape must be one of {PROFILE_SHAPES}")
+
+
+@lru_cache(maxsize=256)
+def plan_intervals(steps, max_speed=DEFAULT_MAX_SPEED, accel=DEFAULT_ACCEL,
+                   shape='trapezoid', start_speed=0.0):
+    """Return the step-to-step intervals (seconds) for a profiled move.
+
+    The table is computed once per (steps, max_speed, accel, shape,
+    start_speed) and cached; the returned array is read-only.
+    """
+    steps = int(steps)
+    if steps <= 0:
+        intervals = np.zeros(0)
+    elif max_speed <= start_speed or accel <= 0:
+        intervals = np.full(steps, 1.0 / max_speed)
+    else:
+        # Velocity at the middle of each step, limited by the distance left
+        # to accelerate in and the distance left to stop in.
+        mid = np.arange(steps) + 0.5
+        v_up = _ramp_velocity(mid, max_speed, accel, shape, start_speed)
+        v_down = _ramp_velocity(steps - mid, max_speed, accel, shape, start_speed)
+        intervals = 1.0 / np.minimum(v_up, v_down)
+    intervals.flags.writeable = False
+    return intervals
+
+
+def profile_duration(steps, max_speed=DEFAULT_MAX_SPEED, accel=DEFAULT_ACCEL, shape='trapezoid'):
+    """Time in seconds a profiled move of this many steps takes"""
+    return float(plan_intervals(steps, max_speed, accel, shape).sum())
+
+
+def run_intervals(driver, intervals, should_stop=None):
+    """Pulse driver.step_pin once per interval, holding each edge for half of it.
+
+    should_stop() is checked before every pulse; returns the steps taken.
+    """
+    for taken, interval in enumerate(intervals.tolist()):
+        if should_stop is not None and should_stop():
+            return taken
+        half = interval / 2.0
+        driver.digital_write(driver.step_pin, 1)
+        driver.backend.sleep(half)
+        driver.digital_write(driver.step_pin, 0)
+        driver.backend.sleep(half)
+    return len(intervals)
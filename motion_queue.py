@@ -0,0 +1,179 @@
+import threading
+import time
+
+from motion_thread import MotionFuture
+
+# Coalescing command queue in front of a motor (or a pair of motors).
+# Only one command is ever pending: relative moves queued behind each other
+# are merged into one, and an absolute target replaces whatever was
+# pending, so the actuator always chases the newest request instead of
+# replaying stale tracking corrections.
+
+
+def _add(a, b):
+    """Add two deltas/targets: numbers, or tuples for multi-axis queues"""
+    if isinstance(a, tuple):
+        return tuple(x + y for x, y in zip(a, b))
+    return a + b
+
+
+def _zero(value):
+    return tuple(0 for _ in value) if isinstance(value, tuple) else 0
+
+
+class MotionQueue:
+    def __init__(self, name, move_by, move_to=None, position=None):
+        """
+        move_by(delta, **options) performs a relative move and blocks until done
+        move_to(target, **options) performs an absolute move (optional)
+        position() returns where the actuator is now; multi-axis queues need it
+        to merge a relative move into an absolute one that leaves an axis as None
+        """
+        self.name = name
+        self._move_by = move_by
+        self._move_to = move_to
+        self._position = position
+        self._cond = threading.Condition()
+        # [kind, value, options, futures, queued_at, offset]; offset is only
+        # used by 'to' and holds deltas still owed to the axes left as None
+        self._pending = None
+        self._running = False  # a command is being executed
+        self._closed = False
+        self.submitted = 0
+        self.executed = 0
+        self.merged = 0
+        self.superseded = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self._latency_total = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=f"queue-{name}", daemon=True)
+        self._thread.start()
+
+    def move_by(self, delta, **options):
+        """Queue a relative move, merging it into a pending one if there is one"""
+        with self._cond:
+            pending = self._pending
+            if pending is None:
+                return self._queue('by', delta, options)
+            partial = pending[0] == 'to' and isinstance(delta, tuple) and None in pending[1]
+            if partial and self._position is None:
+                raise ValueError(f"{self.name} queue needs position() to merge into a partial target")
+            self.submitted += 1
+            self.merged += 1
+            if partial:
+                # An axis the target leaves alone moves by delta from wherever it is then
+                pending[5] = _add(pending[5], tuple(d if t is None else 0 for t, d in zip(pending[1], delta)))
+                pending[1] = tuple(None if t is None else t + d for t, d in zip(pending[1], delta))
+            else:
+                pending[1] = _add(pending[1], delta)  # a pending target moves by delta too
+            pending[2] = options
+            future = MotionFuture()
+            pending[3].append(future)
+            return future
+
+    def move_to(self, target, **options):
+        """Queue an absolute move; anything still pending is superseded by it.
+
+        For multi-axis queues an axis given as None is left where the pending
+        target (or, if nothing is pending, the move_to callback) puts it.
+        """
+        if self._move_to is None:
+            raise ValueError(f"{self.name} queue has no absolute move")
+        with self._cond:
+            pending = self._pending
+            if pending is None:
+                return self._queue('to', target, options)
+            offset = _zero(target)
+            if isinstance(target, tuple) and None in target:
+                # None in a multi-axis target keeps that axis's pending command:
+                # its target, or the delta a pending relative move still owes it
+                if pending[0] == 'to':
+                    old_target, old_offset = pending[1], pending[5]
+                else:
+                    old_target, old_offset = tuple(None for _ in target), pending[1]
+                offset = tuple(o if new is None else 0 for new, o in zip(target, old_offset))
+                target = tuple(old if new is None else new for old, new in zip(old_target, target))
+                if self._position is None and any(offset):
+                    raise ValueError(f"{self.name} queue needs position() to keep a pending relative move")
+            # Callers of the superseded command are answered by this one
+            self.submitted += 1
+            self.superseded += 1
+            pending[0:3] = ['to', target, options]
+            pending[5] = offset
+            future = MotionFuture()
+            pending[3].append(future)
+            return future
+
+    def _queue(self, kind, value, options):
+        self.submitted += 1
+        future = MotionFuture()
+        self._pending = [kind, value, options, [future], time.monotonic(), _zero(value)]
+        self._cond.notify()
+        return future
+
+    def depth(self):
+        """Requests folded into the pending command (0 when nothing is waiting)"""
+        with self._cond:
+            return 0 if self._pending is None else len(self._pending[3])
+
+    def busy(self):
+        """True while a command is executing or pending"""
+        with self._cond:
+            return self._running or self._pending is not None
+
+    def stats(self):
+        with self._cond:
+            return {
+                'depth': 0 if self._pending is None else len(self._pending[3]),
+                'submitted': self.submitted,
+                'executed': self.executed,
+                'merged': self.merged,
+                'superseded': self.superseded,
+                'last_latency': self.last_latency,
+                'max_latency': self.max_latency,
+                'mean_latency': self._latency_total / self.executed if self.executed else 0.0,
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                kind, value, options, futures, queued_at, offset = self._pending
+                self._pending = None
+                self._running = True
+                # Latency: how long the oldest request waited before moving
+                latency = time.monotonic() - queued_at
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self._latency_total += latency
+                self.executed += 1
+
+            result = error = None
+            try:
+                if kind == 'to' and isinstance(value, tuple) and any(offset):
+                    # Axes left as None still owe a merged delta: resolve them
+                    # now that the previous command has finished
+                    value = tuple(p + o if t is None else t
+                                  for t, p, o in zip(value, self._position(), offset))
+                if kind == 'by':
+                    result = self._move_by(value, **options)
+                else:
+                    result = self._move_to(value, **options)
+            except Exception as e:
+                error = e
+            # Idle before the futures resolve, so their waiters see busy() False
+            with self._cond:
+                self._running = False
+            for future in futures:
+                future._finish(result, error)
+
+    def close(self, timeout=None):
+        """Finish the pending command, then stop the queue thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
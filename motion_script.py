@@ -0,0 +1,229 @@
+import csv
+import itertools
+
+import motion_profile
+from stepper import ControlMode, MicroStep
+
+# Batch motion scripts for soak and throughput runs.
+# A script is a text file with one command per line; # starts a comment.
+#
+#   mode 1/8step          microstep mode for the following moves
+#   delay 0.002           fixed stepdelay for the following moves (the default, 0.005)
+#   speed 1000 4000       profiled moves instead: max_speed steps/s, accel steps/s^2,
+#                         and optionally 'scurve'
+#   move 400              relative move
+#   moveto 0              absolute move
+#   dwell 0.5             pause, in seconds
+#   repeat 100            repeat the block up to the matching 'end';
+#   ...                   without a count it repeats until interrupted
+#   end
+#
+# Moves are queued on the driver's motion thread, a couple ahead of the
+# one running, so they run back to back. Every move is timed on that
+# thread against its planned duration.
+
+# Moves queued ahead of the one running
+LOOKAHEAD = 2
+
+CSV_FIELDS = ['move', 'line', 'command', 'setting', 'requested', 'taken', 'position',
+              'planned', 'elapsed', 'rate']
+
+
+def parse(lines, source='<script>'):
+    """Parse script lines into a list of (line number, command, args).
+
+    A repeat block is ('repeat', (count or None, body)). Raises ValueError
+    naming source and line for anything it cannot read.
+    """
+    stack = [(None, [])]
+    for lineno, line in enumerate(lines, 1):
+        words = line.split('#', 1)[0].split()
+        if not words:
+            continue
+        command, args = words[0].lower(), words[1:]
+        where = f"{source}:{lineno}"
+        try:
+            if command == 'end':
+                if len(stack) == 1:
+                    raise ValueError("'end' without 'repeat'")
+                opened, body = stack.pop()
+                stack[-1][1].append((opened[0], 'repeat', (opened[1], body)))
+                continue
+            if command == 'repeat':
+                count = _int(args, 0, 1, optional=True)
+                if count is not None and count < 0:
+                    raise ValueError("repeat count must not be negative")
+                stack.append(((lineno, count), []))
+                continue
+            stack[-1][1].append((lineno, command, _parse_args(command, args)))
+        except ValueError as e:
+            raise ValueError(f"{where}: {e}") from None
+    if len(stack) > 1:
+        raise ValueError(f"{source}:{stack[-1][0][0]}: 'repeat' without 'end'")
+    return stack[0][1]
+
+
+def _parse_args(command, args):
+    if command in ('move', 'moveto'):
+        return _int(args, 0, 1)
+    if command in ('delay', 'dwell'):
+        value = _float(args, 0, 1)
+        if value < 0 or (command == 'delay' and value == 0):
+            raise ValueError(f"{command} must be positive")
+        return value
+    if command == 'speed':
+        if len(args) not in (2, 3):
+            raise ValueError("speed takes max_speed accel [shape]")
+        max_speed, accel = float(args[0]), float(args[1])
+        shape = args[2] if len(args) == 3 else 'trapezoid'
+        if shape not in motion_profile.PROFILE_SHAPES:
+            raise ValueError(f"shape must be one of {motion_profile.PROFILE_SHAPES}")
+        if max_speed <= 0 or accel <= 0:
+            raise ValueError("speed and accel must be positive")
+        return {'max_speed': max_speed, 'accel': accel, 'shape': shape}
+    if command == 'mode':
+        if len(args) != 1 or args[0] not in MicroStep:
+            raise ValueError(f"mode must be one of {list(MicroStep)}")
+        return args[0]
+    raise ValueError(f"unknown command '{command}'")
+
+
+def _int(args, index, count, optional=False):
+    if optional and not args:
+        return None
+    if len(args) != count:
+        raise ValueError(f"expected {count} argument(s)")
+    return int(args[index])
+
+
+def _float(args, index, count):
+    if len(args) != count:
+        raise ValueError(f"expected {count} argument(s)")
+    return float(args[index])
+
+
+def load(path):
+    with open(path) as f:
+        return parse(f, path)
+
+
+def expand(program):
+    """Yield the script's (line number, command, args) in run order, repeats unrolled lazily"""
+    for lineno, command, args in program:
+        if command != 'repeat':
+            yield lineno, command, args
+            continue
+        count, body = args
+        for _ in (itertools.count() if count is None else range(count)):
+            yield from expand(body)
+
+
+class MoveStats:
+    """Running totals per (command, setting), so an overnight run keeps constant memory"""
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, row):
+        key = (row['command'], row['setting'])
+        g = self.groups.setdefault(key, {'moves': 0, 'steps': 0, 'planned': 0.0, 'elapsed': 0.0,
+                                         'slowest': 0.0, 'short': 0})
+        g['moves'] += 1
+        g['steps'] += row['taken']
+        g['planned'] += row['planned']
+        g['elapsed'] += row['elapsed']
+        if row['planned'] > 0:
+            g['slowest'] = max(g['slowest'], row['elapsed'] / row['planned'])
+        if row['taken'] < abs(row['requested']):
+            g['short'] += 1
+
+    def summary(self):
+        lines = [f"{'command':8} {'setting':28} {'moves':>7} {'steps':>9} {'steps/s':>9} "
+                 f"{'vs plan':>8} {'worst':>7} {'short':>6}"]
+        for (command, setting), g in self.groups.items():
+            rate = g['steps'] / g['elapsed'] if g['elapsed'] > 0 else 0.0
+            ratio = g['elapsed'] / g['planned'] if g['planned'] > 0 else 0.0
+            lines.append(f"{command:8} {setting:28} {g['moves']:7d} {g['steps']:9d} {rate:9.0f} "
+                         f"{ratio:7.2f}x {g['slowest']:6.2f}x {g['short']:6d}")
+        return "\n".join(lines)
+
+
+class ScriptRunner:
+    def __init__(self, driver, log_path=None, verbose=True):
+        """Run scripts on driver; log_path gets one CSV row per move"""
+        self.driver = driver
+        self.verbose = verbose
+        self.stats = MoveStats()
+        self.moves = 0
+        self._log_file = open(log_path, 'w', newline='') if log_path else None
+        self._log = csv.DictWriter(self._log_file, CSV_FIELDS) if self._log_file else None
+        if self._log:
+            self._log.writeheader()
+
+    def run(self, program):
+        """Run a parsed script to the end (or until an error or the emergency stop)"""
+        stepdelay, profile = 0.005, None
+        pending = []
+        for lineno, command, args in expand(program):
+            if command == 'delay':
+                stepdelay, profile = args, None
+            elif command == 'speed':
+                stepdelay, profile = None, args
+            else:
+                pending.append(self.driver.motion.submit(self._run_op, lineno, command, args, stepdelay, profile))
+            while len(pending) > LOOKAHEAD:
+                pending.pop(0).result()
+        for future in pending:
+            future.result()
+
+    def _run_op(self, lineno, command, args, stepdelay, profile):
+        driver = self.driver
+        if command == 'mode':
+            driver.SetMicroStep(ControlMode[1], args)
+            return
+        if command == 'dwell':
+            driver.backend.sleep(args)
+            return
+
+        start_position = driver.current_position
+        delta = args if command == 'move' else args - start_position
+        planned = self.planned_duration(delta, stepdelay, profile)
+        start = driver.backend.now()
+        if profile is None:
+            position = driver.move(delta, stepdelay=stepdelay)
+        else:
+            position = driver.move(delta, **profile)
+        elapsed = driver.backend.now() - start
+
+        taken = abs(position - start_position)
+        self.moves += 1
+        row = {
+            'move': self.moves, 'line': lineno, 'command': command,
+            'setting': (f"delay {stepdelay:g}" if profile is None else
+                        f"speed {profile['max_speed']:g} {profile['accel']:g} {profile['shape']}"),
+            'requested': delta, 'taken': taken, 'position': position,
+            'planned': planned, 'elapsed': elapsed,
+            'rate': taken / elapsed if elapsed > 0 else 0.0,
+        }
+        self.stats.add(row)
+        if self._log:
+            self._log.writerow(row)
+        if self.verbose:
+            print(f"{self.moves:6d} line {lineno:3d} {command} {args} -> {position}: "
+                  f"{elapsed * 1000:.1f} ms (plan {planned * 1000:.1f} ms), {row['rate']:.0f} steps/s")
+
+    def planned_duration(self, delta, stepdelay, profile):
+        """Seconds the move should take, phase by phase as move() runs it (ignoring soft limits)"""
+        total = 0.0
+        for stepformat, count in self.driver.plan_gears(delta):
+            if count:
+                if profile is None:
+                    total += count * 2 * stepdelay
+                else:
+                    total += motion_profile.profile_duration(count, **profile)
+        return total
+
+    def close(self):
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
@@ -0,0 +1,182 @@
+import queue
+import threading
+
+import realtime
+
+# Per-motor motion threads.
+# Each driver owns one MotionThread; moves submitted to it run one after
+# another off the caller's thread, and the caller gets a MotionFuture back.
+
+
+class CancelToken:
+    """Checked by a running move between step pulses; cancel() makes it stop early"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class MotionFuture:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.value = None
+        self.exception = None
+        # Set by callers that pass a CancelToken into the move
+        self.cancel_token = None
+
+    def cancel(self):
+        """Stop the move at its next step pulse (or before it starts); False if it has no token"""
+        if self.cancel_token is None:
+            return False
+        self.cancel_token.cancel()
+        return True
+
+    def done(self):
+        """True once the move has finished (or failed)"""
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """Block until the move finishes; False if timeout expires first"""
+        return self._event.wait(timeout)
+
+    def result(self, timeout=None):
+        """Wait for the move and return its value, re-raising any error"""
+        if not self._event.wait(timeout):
+            raise TimeoutError("motion did not finish in time")
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+    def add_done_callback(self, fn, root=None):
+        """Call fn(future) when the move finishes.
+
+        With root (a Tk widget) the call is marshalled onto the Tk main loop
+        via root.after, so fn may touch widgets.
+        """
+        if root is not None:
+            fn = _tk_callback(root, fn)
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self, value=None, exception=None):
+        with self._lock:
+            self.value = value
+            self.exception = exception
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"Motion callback error: {e}")
+
+
+def _tk_callback(root, fn):
+    def schedule(future):
+        try:
+            root.after(0, fn, future)
+        except RuntimeError as e:  # Tk main loop already gone
+            print(f"Could not schedule motion callback: {e}")
+    return schedule
+
+
+def completed(value=None):
+    """A MotionFuture that is already done, for moves with nothing to do"""
+    future = MotionFuture()
+    future._finish(value)
+    return future
+
+
+class MotionThread:
+    def __init__(self, name='motion'):
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._current = None   # future of the move running now
+        # Options for realtime.enter_realtime(), and what it last achieved
+        self.realtime = None
+        self.realtime_report = None
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) behind earlier moves; returns a MotionFuture"""
+        future = MotionFuture()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+                # A restarted thread has to be promoted again
+                if self.realtime is not None and fn != self._apply_realtime:
+                    self._queue.put((self._apply_realtime, (), {}, MotionFuture()))
+            self._queue.put((fn, args, kwargs, future))
+        return future
+
+    def set_realtime(self, cpu=None, priority=50, lock_memory=False):
+        """Opt in to real-time scheduling for this thread's moves.
+
+        Pins the thread to cpu (default: a core of its own, see
+        realtime.claim_cpu), asks for SCHED_FIFO at priority and, with
+        lock_memory, locks the memory mapped so far, falling back to normal
+        scheduling for whatever is not permitted. Returns a MotionFuture for
+        the realtime report.
+        """
+        if cpu is None:
+            cpu = realtime.claim_cpu()  # once, so a restarted thread keeps its core
+        self.realtime = {'cpu': cpu, 'priority': priority, 'lock_memory': lock_memory}
+        return self.submit(self._apply_realtime)
+
+    def _apply_realtime(self):
+        self.realtime_report = realtime.enter_realtime(**self.realtime)
+        return self.realtime_report
+
+    def pending(self):
+        """Number of moves waiting behind the current one"""
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            fn, args, kwargs, future = item
+            self._current = future
+            try:
+                value = fn(*args, **kwargs)
+            except Exception as e:
+                future._finish(exception=e)
+            else:
+                future._finish(value)
+            finally:
+                self._current = None
+
+    def cancel_all(self):
+        """Cancel the running move and every queued one that carries a CancelToken"""
+        with self._queue.mutex:
+            futures = [item[3] for item in self._queue.queue if item is not None]
+        current = self._current
+        if current is not None:
+            futures.append(current)
+        for future in futures:
+            future.cancel()
+
+    def stop(self, timeout=None):
+        """Let queued moves finish, then end the thread"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(None)
+            self._thread = None
+        if thread is not threading.current_thread():
+            thread.join(timeout)
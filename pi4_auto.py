@@ -7,6 +7,8 @@ import mysql.connector
 from mysql.connector import Error
 from datetime import datetime
 import time
+import sim_lgpio
+sim_lgpio.install_from_env()  # GANTRY_SIM=1: simulated gantry in place of lgpio
 import lgpio
 import os
 import webbrowser
@@ -18,6 +20,16 @@ from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
 from ultralytics import YOLO
 from HR8825 import HR8825
+import stepper
+from servo import StableServo
+from servo_pwm import setup_servo_pins
+from pose import go_to_pose
+import xy_motion
+import tracking
+from camera_settle import wait_for_settle_async
+from preset_plans import PresetPlans
+import capture_order
+import realtime
 import threading
 from gpiozero import AngularServo, Device
 from gpiozero.pins.pigpio import PiGPIOFactory
@@ -31,46 +43,36 @@ h = lgpio.gpiochip_open(0)
 SERVO_X_PIN = 27  # BCM 17 for pan servo
 SERVO_Y_PIN = 17  # BCM 27 for tilt servo
 
-# Claim pins as outputs for servo PWM
-lgpio.gpio_claim_output(h, SERVO_X_PIN)
-lgpio.gpio_claim_output(h, SERVO_Y_PIN)
+# Every pin the MotorX/MotorY drivers below use
+STEPPER_PINS = (13, 19, 12, 16, 6, 20, 24, 18, 25, 21, 22, 5)
 
-class StableServo:
-    def __init__(self, pin):
-        self.pin = pin
-        self.current_angle = 90
-    
-    def move_to_angle(self, angle):
-        """Move to specified angle (0-180) and then detach servo signal"""
-        angle = max(0, min(180, angle))
-        pulsewidth = int(500 + (angle / 180.0) * 2000)  # 500-2500μs
-        lgpio.tx_servo(h, self.pin, pulsewidth)  # Attach and move servo
-        time.sleep(0.3)  # Allow time to reach position
-        lgpio.tx_servo(h, self.pin, 0)  # Detach servo (stop PWM signal)
-        self.current_angle = angle
-        
-    def close(self):
-        """Stop servo signal"""
-        lgpio.tx_servo(h, self.pin, 0)
-
-# Initialize servos with stable control
-servo_x = StableServo(SERVO_X_PIN)
-servo_y = StableServo(SERVO_Y_PIN)
+# SERVO_BACKEND=sysfs: kernel PWM on SERVO_PWM_PINS, after rewiring (servo_pwm.py)
+SERVO_BACKEND, (SERVO_X_PIN, SERVO_Y_PIN) = setup_servo_pins(lgpio, h, (SERVO_X_PIN, SERVO_Y_PIN), STEPPER_PINS)
+
+# Ramped servo moves do not jolt the camera on big preset changes, so the
+# image settles sooner. Captures wait for the camera to see a steady image
+# (camera_settle.py), for at most CAPTURE_SETTLE_TIMEOUT seconds
+SERVO_RAMP = True
+CAPTURE_SETTLE_TIMEOUT = 1.0 if SERVO_RAMP else 3.0
+
+# Initialize servos
+servo_x = StableServo(SERVO_X_PIN, h, ramp=SERVO_RAMP, backend=SERVO_BACKEND)
+servo_y = StableServo(SERVO_Y_PIN, h, ramp=SERVO_RAMP, backend=SERVO_BACKEND)
 
 def move_servo_x(angle_change):
-    """Move servo X by specified angle change"""
-    new_angle = servo_x.current_angle + angle_change
-    servo_x.move_to_angle(new_angle)
+    """Move servo X by specified angle change; returns a MotionFuture"""
+    return servo_x.move_to_async(servo_x.current_angle + angle_change)
 
 def move_servo_y(angle_change):
-    """Move servo Y by specified angle change"""
-    new_angle = servo_y.current_angle + angle_change
-    servo_y.move_to_angle(new_angle)
+    """Move servo Y by specified angle change; returns a MotionFuture"""
+    return servo_y.move_to_async(servo_y.current_angle + angle_change)
 
 def reset_servos():
-    """Reset servos to center position"""
-    servo_x.move_to_angle(90)
-    servo_y.move_to_angle(90)
+    """Start both servos back to center together; returns the PoseMove"""
+    return go_to_pose({
+        'servo_x': lambda: servo_x.move_to_async(90),
+        'servo_y': lambda: servo_y.move_to_async(90),
+    }, name='reset')
 
 def cleanup_servos():
     """Clean up servo resources"""
@@ -79,12 +81,15 @@ def cleanup_servos():
     lgpio.gpiochip_close(h)
 
 try:
+    # On lgpio, like the DRV8825 rig: dir/enable/mode go out as one group_write
+    # and TurnStepTrain is timed by lgpio (HR8825 defaults to gpiozero)
     # MotorY: Vertical movement (Y-axis)
     MotorY = HR8825(
         dir_pin=13,    # BCM 27 (Physical pin 13)
         step_pin=19,   # BCM 10 (Physical pin 19)
         enable_pin=12, # BCM 18 (Physical pin 12)
-        mode_pins=(16, 6, 20)  # M0, M1, M2 (BCM 16,17,20)
+        mode_pins=(16, 6, 20),  # M0, M1, M2 (BCM 16,17,20)
+        backend='lgpio'
     )
     
     # MotorX: Horizontal movement (X-axis)
@@ -92,52 +97,72 @@ try:
         dir_pin=24,    # BCM 19 (Physical pin 24)
         step_pin=18,   # BCM 24 (Physical pin 18)
         enable_pin=25,  # BCM 23 (Physical pin 16)
-        mode_pins=(21, 22, 5)  # M0, M1, M2 (BCM 21,22,27)
+        mode_pins=(21, 22, 5),  # M0, M1, M2 (BCM 21,22,27)
+        backend='lgpio'
     )
     
-    # Set microstepping modes - use 'softward' consistently
-    MotorX.SetMicroStep('softward', '1/8step')
-    MotorY.SetMicroStep('softward', '1/8step')
+    # Positions are counted in 1/8 microsteps. Long moves shift to halfstep
+    # (4 units per step) and drop back to 1/8 for the last 200 units
+    MotorX.set_auto_microstep(coarse='halfstep', unit='1/8step', fine_steps=200)
+    MotorY.set_auto_microstep(coarse='halfstep', unit='1/8step', fine_steps=200)
+    
+    # Journals keep the positions across restarts; calibrate_steppers resets them
+    STEPPER_JOURNAL_DIR = os.path.dirname(os.path.abspath(__file__))
+    MotorX.attach_journal(os.path.join(STEPPER_JOURNAL_DIR, 'stepper_x.journal'))
+    MotorY.attach_journal(os.path.join(STEPPER_JOURNAL_DIR, 'stepper_y.journal'))
+    
+    # Per-axis driver settings (stepper.CONFIG_FILE)
+    stepper.load_config(stepper.CONFIG_FILE, {'x': MotorX, 'y': MotorY, 'servo_x': servo_x, 'servo_y': servo_y})
     
 except Exception as e:
     print(f"Motor initialization error: {e}")
     raise
+
+realtime.enable_from_env({'X': MotorX, 'Y': MotorY})  # STEPPER_REALTIME=1
+# Profiled preset moves: ramp up to STEPPER_MAX_SPEED steps/s instead of
+# running the whole traverse at the 0.002 stepdelay (250 steps/s)
+STEPPER_MAX_SPEED = 1000
+STEPPER_ACCEL = 4000
+
+def report_stepper_error(axis):
+    """Done-callback that prints a failed move instead of raising in the motion thread"""
+    def callback(future):
+        if future.exception is not None:
+            print(f"Error moving {axis} stepper: {future.exception}")
+    return callback
+
 def stepper_move_x(steps):
-    """Move X stepper motor by relative steps"""
-    try:
-        if steps > 0:
-            MotorX.TurnStep(direction='forward', steps=abs(steps), stepdelay=0.002)
-        elif steps < 0:
-            MotorX.TurnStep(direction='backward', steps=abs(steps), stepdelay=0.002)
-    except Exception as e:
-        print(f"Error moving X stepper: {e}")
+    """Queue an X stepper move by relative steps; returns a MotionFuture"""
+    future = MotorX.move_async(steps, max_speed=STEPPER_MAX_SPEED, accel=STEPPER_ACCEL)
+    future.add_done_callback(report_stepper_error('X'))
+    return future
 
 def stepper_move_y(steps):
-    """Move Y stepper motor by relative steps"""
-    try:
-        if steps > 0:
-            MotorY.TurnStep(direction='forward', steps=abs(steps), stepdelay=0.002)
-        elif steps < 0:
-            MotorY.TurnStep(direction='backward', steps=abs(steps), stepdelay=0.002)
-    except Exception as e:
-        print(f"Error moving Y stepper: {e}")
+    """Queue a Y stepper move by relative steps; returns a MotionFuture"""
+    future = MotorY.move_async(steps, max_speed=STEPPER_MAX_SPEED, accel=STEPPER_ACCEL)
+    future.add_done_callback(report_stepper_error('Y'))
+    return future
+
+def stepper_move_xy_to(x, y):
+    """Queue a coordinated move of both steppers to absolute (x, y).
+
+    Preset-to-preset moves replay a plan from PRESET_PLANS.
+    """
+    future = xy_motion.move_xy_to_async(MotorX, MotorY, x, y, plans=PRESET_PLANS,
+                                        max_speed=STEPPER_MAX_SPEED, accel=STEPPER_ACCEL)
+    future.add_done_callback(report_stepper_error('XY'))
+    return future
 
 def move_to_preset_position(index):
-    """Move to specific preset position"""
-    if 0 <= index < len(STEPPER_POSITIONS):
-        target = STEPPER_POSITIONS[index]
-        MotorX.move_to_position(target['x'])
-        MotorY.move_to_position(target['y'])
-        return True
-    return False
-def move_to_preset_position(index):
-    """Move to specific preset position"""
+    """Start a move to a preset position, stepping only the difference from here.
+
+    Returns the MotionFuture, or None for an unknown preset.
+    """
     if 0 <= index < len(STEPPER_POSITIONS):
         target = STEPPER_POSITIONS[index]
-        MotorX.move_to_position(target['x'])
-        MotorY.move_to_position(target['y'])
-        return True
-    return False
+        return stepper_move_xy_to(target['x'], target['y'])
+    return None
+
 # Load Haar cascades for face and mouth detection
 face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 mouth_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_smile.xml')
@@ -180,6 +205,19 @@ STEPPER_POSITIONS = [
     {'x': 400, 'y': 500},   # Position 11
     {'x': 200, 'y': 200}    # Position 12
 ]
+
+# Soft limits: the preset envelope plus room for jogging and tracking
+STEPPER_SOFT_MARGIN = 200
+MotorX.set_soft_limits(min(p['x'] for p in STEPPER_POSITIONS) - STEPPER_SOFT_MARGIN,
+                       max(p['x'] for p in STEPPER_POSITIONS) + STEPPER_SOFT_MARGIN)
+MotorY.set_soft_limits(min(p['y'] for p in STEPPER_POSITIONS) - STEPPER_SOFT_MARGIN,
+                       max(p['y'] for p in STEPPER_POSITIONS) + STEPPER_SOFT_MARGIN)
+
+# Every preset-to-preset transition planned once, cached on disk and keyed
+# by STEPPER_POSITIONS and the motion settings
+PRESET_PLANS = PresetPlans(MotorX, MotorY, STEPPER_POSITIONS,
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preset_plans.npz'),
+                           max_speed=STEPPER_MAX_SPEED, accel=STEPPER_ACCEL)
 class ReportGenerator:
     def __init__(self, patient_id, connection):
         self.patient_id = patient_id
@@ -436,6 +474,11 @@ class ImageCaptureApp:
         self.last_capture_time = 0
         self.next_capture_time = 0
         self.current_servo_positions = {'x': 0, 'y': 0}  # Center position
+        # True while a capture waits for a steady image; its thread reads the camera
+        self.settling = False
+
+        # Face/mouth tracking corrections and their calibration (tracking.py)
+        self.tracker = tracking.Tracker(MotorX, MotorY, servo_x, servo_y)
         
         # Create directory for captured images if it doesn't exist
         os.makedirs(self.captured_images_dir, exist_ok=True)
@@ -522,6 +565,11 @@ class ImageCaptureApp:
             '''1. Natural lighting is preferred, ensure that the light source is in the opposite direction of the mouth
 2. Say "aaah!" open mouth wide/big
 3. Tilt head backward''']
+        
+        # The lists above are in clinical order; session_order[step] is the
+        # clinical index (preset and image number) captured at that step
+        self.clinical_lists = (self.image_list, self.gif_list, self.instructions_list)
+        self.session_order = list(range(len(self.image_list)))
        
         # Setup database connection
         self.setup_database()
@@ -535,6 +583,11 @@ class ImageCaptureApp:
         # Center servos initially
         reset_servos()
         
+        # A move was cut off last run: positions are only a guess until homed
+        if MotorX.needs_homing or MotorY.needs_homing:
+            messagebox.showwarning("Calibration", "The steppers were moving when the app last stopped.\n"
+                                   "Home them and recalibrate before capturing.")
+        
         # Bind window events
         self.root.bind("<Configure>", self.on_window_resize)
        
@@ -615,8 +668,8 @@ class ImageCaptureApp:
             MotorY.move_to_position(0)
             
             # Reset position counters
-            MotorX.current_position = 0
-            MotorY.current_position = 0
+            MotorX.set_position(0)
+            MotorY.set_position(0)
             
             messagebox.showinfo("Calibration", "Steppers calibrated to home position")
         except Exception as e:
@@ -774,11 +827,22 @@ class ImageCaptureApp:
         )
         self.auto_capture_btn.pack(side=tk.RIGHT, padx=10)
         
+        # Travel-optimised capture order
+        self.travel_order_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(servo_frame, text="Shortest travel order",
+                        variable=self.travel_order_var,
+                        command=lambda: self.set_capture_order(self.travel_order_var.get())
+                        ).pack(side=tk.RIGHT, padx=10)
+        
         # Reset button
         ttk.Button(servo_frame, text="Reset", 
                   command=reset_servos,
                   style='Accent.TButton').pack(side=tk.RIGHT, padx=10)
         
+        # Measure pixels per step/degree for one-shot tracking corrections
+        ttk.Button(servo_frame, text="Calibrate Tracking", 
+                  command=self.calibrate_tracking).pack(side=tk.RIGHT, padx=10)
+        
         # Stepper Motor controls
         stepper_frame = ttk.LabelFrame(controls_frame, text="Stepper Motor Controls", style='Header.TLabel')
         stepper_frame.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
@@ -867,6 +931,10 @@ class ImageCaptureApp:
     def update_camera_feed(self):
         """Update the camera feed display with face tracking (smaller preview)"""
         if self._camera_running and self.root.winfo_exists():
+            if self.tracker.calibrating or self.settling:
+                # Another thread is reading the camera; just keep the loop alive
+                self.root.after(30, self.update_camera_feed)
+                return
             try:
                 ret, frame = self.cap.read()
                 if ret:
@@ -944,46 +1012,38 @@ class ImageCaptureApp:
         cv2.line(frame, (center_x, 0), (center_x, frame_height), (0, 255, 255), 1)
         
         return frame
+
     def adjust_motors(self, offset_x, offset_y, fine_tune=False):
-        """Adjust both servos and steppers based on offset using StableServo"""
-        # Servo adjustments (0-180 range)
-        if abs(offset_x) > (10 if fine_tune else 20):
-            adjustment = -1 if offset_x > 0 else 1
-            if fine_tune:
-                adjustment *= 0.5  # Smaller adjustments for fine tuning
-            new_angle_x = max(0, min(180, servo_x.current_angle + adjustment))
-            servo_x.move_to_angle(new_angle_x)
-            self.current_servo_positions['x'] = new_angle_x
-            
-            # Stepper motor adjustment for X axis
-            steps = int(abs(offset_x)/5)
-            if steps > 0:
-                MotorX.SetMicroStep('softward', '1/8step')
-                MotorX.TurnStep(
-                    direction='forward' if offset_x < 0 else 'backward',
-                    steps=steps,
-                    stepdelay=0.001 if fine_tune else 0.002
-                )
-                MotorX.Stop()
-        
-        if abs(offset_y) > (10 if fine_tune else 20):
-            adjustment = -1 if offset_y > 0 else 1
-            if fine_tune:
-                adjustment *= 0.5  # Smaller adjustments for fine tuning
-            new_angle_y = max(0, min(180, servo_y.current_angle + adjustment))
-            servo_y.move_to_angle(new_angle_y)
-            self.current_servo_positions['y'] = new_angle_y
-            
-            # Stepper motor adjustment for Y axis
-            steps = int(abs(offset_y)/5)
-            if steps > 0:
-                MotorY.SetMicroStep('softward', '1/8step')
-                MotorY.TurnStep(
-                    direction='forward' if offset_y < 0 else 'backward',
-                    steps=steps,
-                    stepdelay=0.001 if fine_tune else 0.002
-                )
-                MotorY.Stop()
+        """Adjust both servos and steppers based on offset"""
+        self.current_servo_positions.update(self.tracker.adjust(offset_x, offset_y, fine_tune))
+
+    def grab_frame(self, flush=3):
+        """Read a fresh frame, dropping the ones buffered while motors moved"""
+        return tracking.grab_frame(self.cap, flush)
+
+    def wait_for_camera_settle(self, done):
+        """Read preview frames on a worker thread until motion and auto exposure
+        have settled (or the timeout), then call done() on the Tk main loop"""
+        self.timer_label.config(text="Stabilizing...")
+        self.settling = True
+
+        def settled(settle, error):
+            self.settling = False
+            print(settle.report() if error is None else f"Camera settle failed: {error}")
+            self.root.after(0, done)
+
+        wait_for_settle_async(lambda: self.grab_frame(flush=0), settled, timeout=CAPTURE_SETTLE_TIMEOUT)
+
+    def calibrate_tracking(self):
+        """Calibrate backlash and the image Jacobian on a worker thread, so the UI keeps running"""
+        self.tracker.calibrate(self.grab_frame, lambda error: self.root.after(0, self.calibration_done, error))
+
+    def calibration_done(self, error):
+        if error is None:
+            messagebox.showinfo("Tracking Calibration", "Tracking and backlash calibrated and saved")
+        else:
+            messagebox.showerror("Tracking Calibration", f"Calibration failed: {error}")
+
     def toggle_auto_capture(self):
         """Start/stop auto-capture with perfect 12-second intervals"""
         if not self.auto_capture_active:
@@ -1030,39 +1090,59 @@ class ImageCaptureApp:
 
     def perform_capture_sequence(self):
         """Handle the entire capture process with guaranteed timing"""
+        self.start_capture("Capture failed")
+
+    def auto_capture_image(self):
+        """Auto-capture with perfect 12-second intervals and stepper/servo coordination"""
+        if not self._camera_running:
+            self.capture_failed("Auto-capture failed", "Camera not available")
+            return
+        self.start_capture("Auto-capture failed")
+
+    def start_capture(self, error_title):
+        """Move to the current position, wait for a steady image, then capture.
+
+        Each step is started from a callback on the Tk main loop once the one
+        before is done, so the UI keeps running while the gantry moves.
+        """
+        # 1. Move to position
+        self.timer_label.config(text="Moving to position...", foreground='orange')
+        pose = self.move_to_position()
+        if pose is None:
+            self.capture_failed(error_title, "Failed to move to position")
+            return
+
+        # 2. Wait for a steady image, 3. capture
+        pose.add_done_callback(
+            lambda p: self.wait_for_camera_settle(lambda: self.capture_at_position(error_title)),
+            root=self.root)
+
+    def capture_at_position(self, error_title):
+        """Capture and save the image once the gantry and camera are steady"""
+        if not self.auto_capture_active:
+            return  # stopped while moving
         try:
-            # 1. Move to position
-            self.timer_label.config(text="Moving to position...", foreground='orange')
-            self.root.update()
-            if not self.move_to_position():
-                raise Exception("Failed to move to position")
-            
-            # 2. Small stabilization delay
-            time.sleep(1)
-            
-            # 3. Capture image
             self.timer_label.config(text="Capturing...", foreground='orange')
-            self.root.update()
             ret, frame = self.cap.read()
             if not ret:
                 raise Exception("Failed to capture image")
-            
+
             # 4. Save image
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             self.captured_image = Image.fromarray(frame_rgb)
             self.save_image(auto_save=True)
             self.flash_screen()
-            
+
             # 5. Prepare for next capture
             if self.current_image_index < len(self.image_list) - 1:
                 self.current_image_index += 1
                 self.display_current_view()
-                
+
                 # Set next capture exactly 12 seconds from NOW
                 self.next_capture_time = time.time() + 12
                 self.timer_label.config(text=f"Next capture in: 12s", foreground='green')
-                self.root.update()
-                
+                self.update_position_display()
+
                 # Restart countdown
                 self.root.after(1000, self.update_timer_display)
             else:
@@ -1072,86 +1152,28 @@ class ImageCaptureApp:
                 #self.update_ui_auto_capture_status()
                 messagebox.showinfo("Complete", "All images captured successfully!")
                 self.finish_capture()
-                
-        except Exception as e:
-            self.auto_capture_active = False
-            self.tracking_active = True
-            #self.update_ui_auto_capture_status()
-            messagebox.showerror("Error", f"Capture failed: {str(e)}")
-
-    def auto_capture_image(self):
-        """Auto-capture with perfect 12-second intervals and stepper/servo coordination"""
-        try:
-            if not self._camera_running:
-                raise Exception("Camera not available")
-            
-            # 1. Position Movement
-            self.timer_label.config(text="Moving to position...", foreground='orange')
-            self.root.update()
-            
-            if not self.move_to_position():
-                raise Exception("Failed to move to position")
-            
-            # 2. Stabilization Delay
-            for i in range(3, 0, -1):
-                self.timer_label.config(text=f"Stabilizing... {i}")
-                self.root.update()
-                time.sleep(1)
-            
-            # 3. Image Capture
-            self.timer_label.config(text="Capturing...", foreground='orange')
-            self.root.update()
-            ret, frame = self.cap.read()
-            if not ret:
-                raise Exception("Capture failed")
-            
-            # 4. Save Image
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            self.captured_image = Image.fromarray(frame_rgb)
-            self.save_image(auto_save=True)
-            self.flash_screen()
-            
-            # 5. Schedule Next Capture
-            if self.current_image_index < len(self.image_list) - 1:
-                self.current_image_index += 1
-                self.display_current_view()
-                
-                # Set next capture exactly 12 seconds from now
-                self.next_capture_time = time.time() + 12
-                self.timer_label.config(text=f"Next capture in: 12s", foreground='green')
-                self.root.update()
-                
-                # Update position display
-                self.update_position_display()
-                
-                # Continue sequence
-                self.root.after(1000, self.update_timer_display)
-            else:
-                # All captures complete
-                self.auto_capture_active = False
-                self.tracking_active = True
-                #self.update_ui_auto_capture_status()
-                messagebox.showinfo("Complete", "All images captured successfully!")
-                self.finish_capture()
 
         except Exception as e:
-            self.auto_capture_active = False
-            self.tracking_active = True
-            #self.update_ui_auto_capture_status()
-            messagebox.showerror("Error", f"Auto-capture failed: {str(e)}")
+            self.capture_failed(error_title, str(e))
+
+    def capture_failed(self, error_title, error):
+        self.auto_capture_active = False
+        self.tracking_active = True
+        #self.update_ui_auto_capture_status()
+        messagebox.showerror("Error", f"{error_title}: {error}")
 
     def move_to_preset_position(self, index):
         """Move to specific preset position (manual control)"""
         if 0 <= index < len(SERVO_POSITIONS):
             self.current_image_index = index
             self.display_current_view()
-            self.move_to_position(index)
-            self.update_position_display()
+            self.move_to_position(index).add_done_callback(lambda p: self.update_position_display(),
+                                                           root=self.root)
 
     def calibrate_steppers(self):
         """Calibrate stepper motors to home position"""
-        MotorX.current_position = 0
-        MotorY.current_position = 0
+        MotorX.set_position(0)
+        MotorY.set_position(0)
         self.position_label.config(text="X: 0 | Y: 0")
         messagebox.showinfo("Calibrated", "Steppers reset to home position")
 
@@ -1164,28 +1186,63 @@ class ImageCaptureApp:
             """Move both steppers to preset position"""
             if 0 <= index < len(STEPPER_POSITIONS):
                 target = STEPPER_POSITIONS[index]
-                stepper_move_x(target['x'])
-                stepper_move_y(target['y'])
+                stepper_move_xy_to(target['x'], target['y'])
                 return True
             return False
 
     def move_to_position(self, index=None):
-        """Move servos to predefined position for current or specified index using StableServo"""
-        time.sleep(1)
+        """Start servos and steppers together to the preset for current or specified index.
+
+        Returns the PoseMove, or None for an unknown index.
+        """
         if index is None:
             index = self.current_image_index
         
         if 0 <= index < len(SERVO_POSITIONS):
-            target_pos = SERVO_POSITIONS[index]
-            servo_x.move_to_angle(target_pos['x'])
-            servo_y.move_to_angle(target_pos['y'])
+            preset = self.session_order[index]
+            target_pos = SERVO_POSITIONS[preset]
+            stepper_target = STEPPER_POSITIONS[preset]
+            # All four actuators start together; the pose is reached when the
+            # slowest is done. STEPPER_POSITIONS are absolute: the steppers
+            # step only the difference from the current position
+            pose = go_to_pose({
+                'servo_x': lambda: servo_x.move_to_async(target_pos['x']),
+                'servo_y': lambda: servo_y.move_to_async(target_pos['y']),
+                'steppers': lambda: stepper_move_xy_to(stepper_target['x'], stepper_target['y']),
+            }, name=f"preset {preset + 1}")
             self.current_servo_positions = target_pos.copy()
-            stepper_target = STEPPER_POSITIONS[index]
-            stepper_move_x(stepper_target['x'])
-            stepper_move_y(stepper_target['y'])
-            return True
-        return False
+            return pose
+        return None
     
+    def set_capture_order(self, optimise):
+        """Capture in clinical order, or in the order with the least stepper travel.
+
+        The first view (with the preparation instructions) stays first.
+        Reference images, GIFs and instructions are reordered together and
+        saved images keep their clinical image numbers.
+        """
+        if self.auto_capture_active:
+            self.travel_order_var.set(not optimise)
+            messagebox.showwarning("Capture Order", "Stop auto capture before changing the order")
+            return
+
+        count = len(self.clinical_lists[0])
+        order = list(range(count))
+        if optimise:
+            positions = [(p['x'], p['y']) for p in STEPPER_POSITIONS[:count]]
+            cost = capture_order.transition_times(positions, PRESET_PLANS.duration)
+            order = capture_order.shortest_order(cost, start=0)
+            saved = capture_order.path_time(cost, list(range(count))) - capture_order.path_time(cost, order)
+            print(f"Capture order {[i + 1 for i in order]}: {saved:.1f}s less stepper travel")
+            messagebox.showinfo("Capture Order", f"Shortest travel order saves about {saved:.1f}s "
+                                "of stepper travel per session")
+
+        self.session_order = order
+        self.image_list, self.gif_list, self.instructions_list = (
+            [items[i] for i in order] for items in self.clinical_lists)
+        self.current_image_index = 0
+        self.display_current_view()
+
     def flash_screen(self):
         """Briefly flash the camera display to indicate capture"""
         original_bg = self.camera_label.cget('background')
@@ -1368,7 +1425,7 @@ class ImageCaptureApp:
         try:
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            img_num = self.current_image_index + 1
+            img_num = self.session_order[self.current_image_index] + 1  # clinical number
             filename = f"patient_{self.patient_id}_img_{img_num}_{timestamp}.jpg"
             filepath = os.path.join(self.captured_images_dir, filename)
             
@@ -1644,6 +1701,8 @@ Your Dental Clinic"""
         if hasattr(self, 'cap'):
             self.cap.release()
         
+        self.tracker.close()
+
         # Clean up servos and motors
         cleanup_servos()
         if 'MotorX' in globals():
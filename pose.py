@@ -0,0 +1,103 @@
+import threading
+import time
+
+from motion_thread import _tk_callback
+
+# Go-to-pose: start every actuator's move at once and finish with the slowest.
+# Each actuator is timed from the common start to its own completion, so
+# the report shows how much of a capture step is spent waiting on each one.
+
+
+class PoseMove:
+    def __init__(self, name=None):
+        self.name = name
+        self.started = time.monotonic()
+        self.times = {}        # actuator -> seconds from start to done
+        self.errors = {}       # actuator -> exception
+        self.total = None      # seconds until the slowest was done
+        self._futures = {}
+        self._sealed = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._callbacks = []
+
+    def _add(self, actuator, future):
+        with self._lock:
+            self._futures[actuator] = future
+        future.add_done_callback(lambda f: self._finished(actuator, f))
+
+    def _finished(self, actuator, future):
+        with self._lock:
+            self.times[actuator] = time.monotonic() - self.started
+            if future.exception is not None:
+                self.errors[actuator] = future.exception
+        self._maybe_done()
+
+    def _seal(self):
+        """No more actuators will be added"""
+        with self._lock:
+            self._sealed = True
+        self._maybe_done()
+
+    def _maybe_done(self):
+        with self._lock:
+            if not self._sealed or len(self.times) < len(self._futures) or self._done.is_set():
+                return
+            self.total = max(self.times.values(), default=0.0)
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Block until every actuator has finished; False if timeout expires first"""
+        return self._done.wait(timeout)
+
+    def result(self, timeout=None):
+        """Wait, then re-raise the first actuator error; returns {actuator: seconds}"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("pose not reached in time")
+        for error in self.errors.values():
+            raise error
+        return dict(self.times)
+
+    def add_done_callback(self, fn, root=None):
+        """Call fn(pose) once every actuator has finished.
+
+        With root (a Tk widget) the call is marshalled onto the Tk main loop,
+        as for MotionFuture.add_done_callback.
+        """
+        if root is not None:
+            fn = _tk_callback(root, fn)
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def report(self):
+        parts = [f"{actuator} {seconds:.2f}s" for actuator, seconds in
+                 sorted(self.times.items(), key=lambda item: item[1])]
+        parts += [f"{actuator} failed: {error}" for actuator, error in self.errors.items()]
+        label = f"Pose {self.name}" if self.name else "Pose"
+        return f"{label}: {', '.join(parts)}; total {self.total:.2f}s"
+
+
+def go_to_pose(moves, name=None):
+    """Start every move at once and return a PoseMove for them.
+
+    moves is {actuator name: start()}, where start() begins that actuator's
+    move without blocking and returns a MotionFuture (servo
+    move_to_async, stepper move_to_async, xy_motion.move_xy_to_async).
+    With name, the timing report is printed once the pose is reached.
+    """
+    pose = PoseMove(name)
+    for actuator, start in moves.items():
+        pose._add(actuator, start())
+    pose._seal()
+    if name is not None:
+        pose.add_done_callback(lambda p: print(p.report()))
+    return pose
@@ -0,0 +1,55 @@
+import mmap
+import os
+import struct
+
+# Memory-mapped stepper position journal.
+# One small file per motor holds the last settled position and microstep
+# mode plus a dirty flag that is set while the motor is moving. After a
+# clean shutdown the position can be trusted; a dirty journal means the
+# process died mid-move and the axis has to be re-homed.
+
+MAGIC = b'STPJ'
+VERSION = 1
+# magic, version, dirty, microstep index, position, sequence
+RECORD = struct.Struct('<4sHBBqQ')
+NO_MODE = 0xFF
+
+
+class PositionJournal:
+    def __init__(self, path, modes):
+        """modes: list of microstep names, stored by index"""
+        self.path = path
+        self.modes = list(modes)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < RECORD.size:
+                os.ftruncate(fd, RECORD.size)
+            self._map = mmap.mmap(fd, RECORD.size)
+        finally:
+            os.close(fd)  # the mapping keeps the file open
+
+    def load(self):
+        """Return (position, microstep, clean), or None for a new or unreadable journal"""
+        magic, version, dirty, mode, position, sequence = RECORD.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            return None
+        microstep = self.modes[mode] if mode < len(self.modes) else None
+        return position, microstep, not dirty
+
+    def _write(self, dirty, position, microstep):
+        sequence = RECORD.unpack_from(self._map)[5] if self._map[:4] == MAGIC else 0
+        mode = self.modes.index(microstep) if microstep in self.modes else NO_MODE
+        RECORD.pack_into(self._map, 0, MAGIC, VERSION, dirty, mode, position, sequence + 1)
+        self._map.flush()
+
+    def begin_move(self):
+        """Mark the journal dirty before the first step pulse"""
+        self._map[6] = 1  # dirty byte, after magic and version
+        self._map.flush()
+
+    def end_move(self, position, microstep):
+        """Record the settled position and clear the dirty flag"""
+        self._write(0, position, microstep)
+
+    def close(self):
+        self._map.close()
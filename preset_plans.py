@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+import xy_motion
+
+# Precomputed preset-to-preset stepper moves.
+# The capture flows only ever travel between the same preset positions, so
+# every transition is planned once with xy_motion.plan_xy() (gear phases,
+# step intervals and Bresenham tick masks) and stored in an .npz file.
+# The file is keyed by a hash of the preset table and the motion settings;
+# changing either rebuilds it on the next start.
+
+# Bump when the plan layout or the planning code changes meaning
+PLAN_FORMAT = 1
+
+
+class PresetPlans:
+    def __init__(self, motor_x, motor_y, positions, path, **profile):
+        """positions: list of {'x', 'y'} presets; profile as for plan_xy()"""
+        self.path = path
+        self.positions = sorted({(p['x'], p['y']) for p in positions})
+        self.key = hashlib.sha256(json.dumps({
+            'format': PLAN_FORMAT,
+            'positions': self.positions,
+            'gears': [motor_x.gears, motor_y.gears],
+            'profile': profile,
+        }, sort_keys=True).encode()).hexdigest()
+        self.plans = {}   # (start, target) -> phases
+
+        if self._load():
+            print(f"Loaded {len(self.plans)} preset transitions from {path}")
+        else:
+            self._build(motor_x, motor_y, profile)
+            self._save()
+            print(f"Planned {len(self.plans)} preset transitions into {path}")
+
+    def lookup(self, start, target):
+        """Phases for a move from start to target (x, y), or None if not a planned transition"""
+        return self.plans.get((tuple(start), tuple(target)))
+
+    def duration(self, start, target):
+        """Seconds the planned move from start to target takes; 0 when there is none"""
+        phases = self.lookup(start, target)
+        return sum(float(intervals.sum()) for _, _, intervals, _ in phases) if phases else 0.0
+
+    def _build(self, motor_x, motor_y, profile):
+        for start in self.positions:
+            for target in self.positions:
+                if start != target:
+                    self.plans[(start, target)] = xy_motion.plan_xy(
+                        motor_x, motor_y, target[0] - start[0], target[1] - start[1],
+                        start=start, **profile)
+
+    def _save(self):
+        # All phases end to end; each row says whose they are and where they sit
+        rows, modes, intervals, masks = [], [], [], []
+        offset = 0
+        for (start, target), phases in self.plans.items():
+            for mode_x, mode_y, phase_intervals, phase_masks in phases:
+                rows.append([start[0], start[1], target[0], target[1], offset, len(phase_intervals)])
+                modes.append([mode_x or '', mode_y or ''])
+                intervals.append(phase_intervals)
+                masks.append(phase_masks)
+                offset += len(phase_intervals)
+
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(
+                f, key=np.array(self.key),
+                rows=np.array(rows, dtype=np.int64).reshape(-1, 6),
+                modes=np.array(modes, dtype=str).reshape(-1, 2),
+                intervals=np.concatenate(intervals) if intervals else np.zeros(0),
+                masks=np.concatenate(masks) if masks else np.zeros(0, dtype=np.uint8))
+        os.replace(tmp, self.path)
+
+    def _load(self):
+        """Fill self.plans from the file; False if it is missing, stale or unreadable"""
+        try:
+            with np.load(self.path) as data:
+                if str(data['key']) != self.key:
+                    return False
+                rows, modes = data['rows'], data['modes']
+                intervals, masks = data['intervals'], data['masks']
+        except (OSError, KeyError, ValueError) as e:
+            if os.path.exists(self.path):
+                print(f"Preset plan cache unreadable, replanning: {e}")
+            return False
+
+        for (x0, y0, x1, y1, offset, length), (mode_x, mode_y) in zip(rows.tolist(), modes.tolist()):
+            phase = (mode_x or None, mode_y or None,
+                     intervals[offset:offset + length], masks[offset:offset + length])
+            self.plans.setdefault(((x0, y0), (x1, y1)), []).append(phase)
+        return True
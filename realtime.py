@@ -0,0 +1,115 @@
+import ctypes
+import os
+import threading
+
+# Real-time scheduling for the thread that generates step pulses.
+# Each part (core pinning, SCHED_FIFO, locked memory) is tried on its own
+# and simply skipped when the OS or our privileges do not allow it, so the
+# worst case is the ordinary time-shared thread we had before.
+# SCHED_FIFO and mlockall need root, CAP_SYS_NICE/CAP_IPC_LOCK or matching
+# rtprio/memlock limits. Booting with isolcpus=<cpu> keeps the chosen core
+# free of everything else.
+#
+# Each real-time thread gets its own core, counting down from the last one,
+# so the X and Y motion threads do not compete. Memory locking is opt-in and
+# only locks what is mapped now (MCL_CURRENT): locking future allocations
+# too would pin every later YOLO/OpenCV buffer and can run a Pi out of RAM.
+
+MCL_CURRENT = 1
+
+_claim_lock = threading.Lock()
+_claims = 0
+
+POLICY_NAMES = {
+    getattr(os, 'SCHED_OTHER', 0): 'SCHED_OTHER',
+    getattr(os, 'SCHED_FIFO', 1): 'SCHED_FIFO',
+    getattr(os, 'SCHED_RR', 2): 'SCHED_RR',
+}
+
+
+def claim_cpu():
+    """Core for one more real-time thread: the last core, then the one before,
+    and so on, leaving core 0 to the rest of the process (wraps around when
+    there are more threads than cores)"""
+    global _claims
+    with _claim_lock:
+        count = os.cpu_count() or 1
+        cores = list(range(count - 1, 0, -1)) or [0]
+        cpu = cores[_claims % len(cores)]
+        _claims += 1
+        return cpu
+
+
+def enter_realtime(cpu=None, priority=50, lock_memory=False):
+    """Promote the calling thread; returns a report of what was achieved.
+
+    cpu is the core to pin to (default: claim_cpu()). lock_memory locks the
+    pages mapped so far, not later allocations. The report has
+    'cpus', 'policy', 'priority', 'memory_locked' and 'errors', one entry
+    for every step that had to fall back.
+    """
+    errors = []
+    # pid 0 means the calling thread for these Linux calls
+    try:
+        if cpu is None:
+            cpu = claim_cpu()
+        os.sched_setaffinity(0, {cpu})
+    except (AttributeError, OSError) as e:
+        errors.append(f"affinity: {e}")
+
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+    except (AttributeError, OSError) as e:
+        errors.append(f"SCHED_FIFO: {e}")
+
+    memory_locked = False
+    if lock_memory:
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.mlockall(MCL_CURRENT) != 0:
+                raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+            memory_locked = True
+        except (AttributeError, OSError) as e:
+            errors.append(f"mlockall: {e}")
+
+    return current_report(memory_locked, errors)
+
+
+def current_report(memory_locked=False, errors=()):
+    """Scheduling class, priority and cores the calling thread actually has"""
+    try:
+        policy = POLICY_NAMES.get(os.sched_getscheduler(0), 'unknown')
+        priority = os.sched_getparam(0).sched_priority
+        cpus = sorted(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        policy, priority, cpus = 'unknown', 0, []
+    return {
+        'policy': policy,
+        'priority': priority,
+        'cpus': cpus,
+        'memory_locked': memory_locked,
+        'errors': list(errors),
+    }
+
+
+def describe(report):
+    """One line for the console"""
+    text = (f"{report['policy']} priority {report['priority']} on cpus {report['cpus']}, "
+            f"memory {'locked' if report['memory_locked'] else 'not locked'}")
+    if report['errors']:
+        text += " (fell back: " + "; ".join(report['errors']) + ")"
+    return text
+
+
+def enable_from_env(motors):
+    """Opt-in with STEPPER_REALTIME=1: promote each {axis: driver} motion thread.
+
+    Each axis then generates its steps on a core of its own at SCHED_FIFO,
+    so YOLO/OpenCV load does not stretch step timing. Without root or rtprio
+    limits it falls back to normal scheduling and says so.
+    """
+    if os.environ.get('STEPPER_REALTIME') != '1':
+        return
+    for axis, motor in motors.items():
+        report = motor.motion.set_realtime().result()
+        print(f"Stepper {axis} motion thread: {describe(report)}")
@@ -0,0 +1,140 @@
+import time
+
+# Recording stand-in for the lgpio module.
+# Pass an instance wherever a driver accepts gpio=... and every call is
+# logged with a timestamp, so pulse timing can be checked without a Pi.
+
+TX_PWM = 0
+TX_WAVE = 1
+
+
+class RecordingLgpio:
+    TX_PWM = TX_PWM
+    TX_WAVE = TX_WAVE
+
+    def __init__(self, realtime=True):
+        """realtime=False makes queued pulse trains finish instantly"""
+        self.realtime = realtime
+        self.calls = []       # (time, function name, args)
+        self.levels = {}      # gpio -> last written level
+        self.groups = {}      # group leader -> claimed gpios
+        self.trains = []      # [gpio, start, on_us, off_us, cycles] per tx_pulse
+        self._next_handle = 0
+
+    def _now(self):
+        return time.perf_counter()
+
+    def sleep(self, seconds):
+        """Pacing hook for the drivers; waits in real time here"""
+        time.sleep(seconds)
+
+    def _record(self, name, *args):
+        t = self._now()
+        self.calls.append((t, name, args))
+        return t
+
+    def gpiochip_open(self, chip):
+        self._record('gpiochip_open', chip)
+        handle = self._next_handle
+        self._next_handle += 1
+        return handle
+
+    def gpiochip_close(self, handle):
+        self._record('gpiochip_close', handle)
+        return 0
+
+    def gpio_claim_output(self, handle, gpio, level=0, lFlags=0):
+        self._record('gpio_claim_output', handle, gpio, level)
+        self.levels[gpio] = level
+        return 0
+
+    def gpio_write(self, handle, gpio, level):
+        self._record('gpio_write', handle, gpio, level)
+        self.levels[gpio] = level
+        return 0
+
+    def group_claim_output(self, handle, gpios, levels=None, lFlags=0):
+        levels = levels or [0] * len(gpios)
+        self._record('group_claim_output', handle, list(gpios), list(levels))
+        self.groups[gpios[0]] = list(gpios)
+        self.levels.update(zip(gpios, levels))
+        return 0
+
+    def group_write(self, handle, gpio, group_bits, group_mask=-1):
+        self._record('group_write', handle, gpio, group_bits, group_mask)
+        for i, pin in enumerate(self.groups[gpio]):
+            if group_mask & (1 << i):
+                self.levels[pin] = 1 if group_bits & (1 << i) else 0
+        return 0
+
+    def tx_pulse(self, handle, gpio, pulse_on, pulse_off, pulse_offset=0, pulse_cycles=0):
+        t = self._record('tx_pulse', handle, gpio, pulse_on, pulse_off, pulse_offset, pulse_cycles)
+        # A new request replaces the running train; 0/0 just cancels it
+        self._cancel_train(gpio, t)
+        if pulse_on or pulse_off:
+            self.trains.append([gpio, t + pulse_offset / 1e6, pulse_on, pulse_off, pulse_cycles])
+        return 0
+
+    def tx_servo(self, handle, gpio, pulse_width, servo_frequency=50, pulse_offset=0, pulse_cycles=0):
+        self._record('tx_servo', handle, gpio, pulse_width, servo_frequency)
+        return 0
+
+    def tx_busy(self, handle, gpio, kind):
+        self._record('tx_busy', handle, gpio, kind)
+        return 1 if self._train_end(gpio) > self._now() else 0
+
+    def _active_train(self, gpio):
+        for train in reversed(self.trains):
+            if train[0] == gpio:
+                return train
+        return None
+
+    def _train_end(self, gpio):
+        train = self._active_train(gpio)
+        if train is None or not self.realtime:
+            return 0.0
+        gpio, start, on_us, off_us, cycles = train
+        if cycles == 0:
+            return float('inf')
+        return start + cycles * (on_us + off_us) / 1e6
+
+    def _cancel_train(self, gpio, t):
+        """Truncate the running train on gpio to the pulses started before t"""
+        train = self._active_train(gpio)
+        if train is None or t >= self._train_end(gpio):
+            return
+        period = (train[2] + train[3]) / 1e6
+        train[4] = max(0, int((t - train[1]) / period) + 1) if period > 0 else 0
+
+    def edges(self, gpio):
+        """Return [(time, level)] for gpio, expanding queued pulse trains"""
+        out = []
+        for t, name, args in self.calls:
+            if name == 'gpio_write' and args[1] == gpio:
+                out.append((t, args[2]))
+            elif name == 'group_write' and gpio in self.groups.get(args[1], ()):
+                bit = 1 << self.groups[args[1]].index(gpio)
+                if args[3] & bit:
+                    out.append((t, 1 if args[2] & bit else 0))
+        for train_gpio, start, on_us, off_us, cycles in self.trains:
+            if train_gpio != gpio:
+                continue
+            for i in range(cycles):
+                rise = start + i * (on_us + off_us) / 1e6
+                out.append((rise, 1))
+                out.append((rise + on_us / 1e6, 0))
+        out.sort(key=lambda e: e[0])
+        return out
+
+    def step_periods(self, gpio):
+        """Return the intervals between rising edges on gpio, in seconds"""
+        rises = [t for t, level in self.edges(gpio) if level]
+        return [b - a for a, b in zip(rises, rises[1:])]
+
+    def count(self, name):
+        """Number of recorded calls to the named lgpio function"""
+        return sum(1 for call in self.calls if call[1] == name)
+
+    def reset(self):
+        self.calls = []
+        self.trains = []
@@ -0,0 +1,275 @@
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from motion_thread import MotionFuture
+from servo_pwm import LgpioServoOutput, SysfsPwmOutput, SYSFS_PWM_ROOT
+
+# Pan/tilt hobby servos on lgpio.tx_servo, or on kernel hardware PWM with
+# backend='sysfs' (see servo_pwm.py).
+# Each StableServo has a controller thread: a new target angle is sent
+# straight away and the caller gets a MotionFuture, while the thread
+# detaches the pulse (tx_servo(h, pin, 0), so the servo stops buzzing) once
+# the horn should have arrived. Travel time is estimated from the angle
+# still to go and slew_rate, instead of a fixed sleep per move.
+#
+# With ramp=True the thread does not jump to the final pulse width: it
+# steps the pulse along a precomputed accelerate/cruise/decelerate profile
+# every SERVO_TICK, so big moves do not jolt the camera and ring less.
+#
+# Hardware PWM pulses do not jitter, so on the sysfs backend the signal is
+# left on after a move and the servo keeps holding; futures still complete
+# at the estimated arrival. detach() and close() turn it off.
+
+# Degrees per second under the camera's load, and extra time to stop ringing;
+# both can be overridden per servo from the driver config (see settings())
+SERVO_SLEW_RATE = 300.0
+SERVO_SETTLE = 0.05
+
+# Ramp profile limits (deg/s, deg/s^2) and pulse update period; lgpio sends
+# servo frames at 50 Hz, so updating faster than 20 ms gains nothing
+SERVO_RAMP_SPEED = 180.0
+SERVO_RAMP_ACCEL = 900.0
+SERVO_TICK = 0.02
+
+
+@lru_cache(maxsize=256)
+def ramp_profile(distance, max_speed=SERVO_RAMP_SPEED, accel=SERVO_RAMP_ACCEL, tick=SERVO_TICK):
+    """Distance covered (degrees, from 0) at each tick of a trapezoidal ramp.
+
+    The last entry is exactly abs(distance). The table is computed once per
+    (distance, max_speed, accel, tick) and cached; it is read-only.
+    """
+    distance = abs(distance)
+    if distance == 0:
+        profile = np.zeros(1)
+    else:
+        t_accel = min(max_speed / accel, np.sqrt(distance / accel))
+        cruise_speed = accel * t_accel
+        t_cruise = (distance - cruise_speed * t_accel) / cruise_speed
+        total = 2 * t_accel + t_cruise
+        t = np.arange(1, int(np.ceil(total / tick)) + 1) * tick
+        t_down = np.clip(total - t, 0.0, None)
+        profile = np.where(
+            t < t_accel, 0.5 * accel * t ** 2,
+            np.where(t_down < t_accel, distance - 0.5 * accel * t_down ** 2,
+                     0.5 * accel * t_accel ** 2 + cruise_speed * (t - t_accel)))
+        profile[-1] = distance
+    profile.flags.writeable = False
+    return profile
+
+
+class StableServo:
+    def __init__(self, pin, handle, gpio=None, min_angle=0, max_angle=180,
+                 min_pulse=500, max_pulse=2500, angle=None,
+                 slew_rate=SERVO_SLEW_RATE, settle=SERVO_SETTLE,
+                 ramp=False, ramp_speed=SERVO_RAMP_SPEED, ramp_accel=SERVO_RAMP_ACCEL,
+                 backend='lgpio', pwm_chip=0, pwm_root=SYSFS_PWM_ROOT):
+        """
+        handle: lgpio chip handle the pin is claimed on (unused with backend='sysfs')
+        min_pulse/max_pulse: pulse widths in us for min_angle/max_angle
+        angle: where the servo is assumed to start (default: mid range)
+        ramp: follow a ramp_speed/ramp_accel profile instead of jumping
+        backend: 'lgpio', 'sysfs' (kernel PWM on GPIO 12/13/18/19, pwmchip pwm_chip
+                 under pwm_root) or an object with write(pulse_width)/close()/holds
+        """
+        if backend == 'lgpio':
+            if gpio is None:
+                import lgpio as gpio
+            output = LgpioServoOutput(gpio, handle, pin)
+        elif backend == 'sysfs':
+            output = SysfsPwmOutput(pin, chip=pwm_chip, root=pwm_root)
+        elif isinstance(backend, str):
+            raise ValueError("backend must be 'lgpio' or 'sysfs'")
+        else:
+            output = backend
+        self.gpio = gpio
+        self.output = output
+        self.h = handle
+        self.pin = pin
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.min_pulse = min_pulse
+        self.max_pulse = max_pulse
+        self.slew_rate = slew_rate
+        self.settle = settle
+        self.ramp = ramp
+        self.ramp_speed = ramp_speed
+        self.ramp_accel = ramp_accel
+
+        # Commanded angle; the horn may still be on its way there
+        self.current_angle = (min_angle + max_angle) / 2.0 if angle is None else angle
+
+        # The simulator runs on its own clock, and needs this servo's pulse range
+        if getattr(gpio, 'simulated', False):
+            self._now, self._speed = gpio.clock.now, gpio.clock.speed
+            gpio.configure_servo(pin, min_angle, max_angle, min_pulse, max_pulse)
+        else:
+            self._now, self._speed = time.monotonic, 1.0
+
+        self._cond = threading.Condition()
+        self._sent = self.current_angle  # angle of the last pulse sent
+        self._from = self.current_angle  # estimated horn angle at _since
+        self._since = self._now()
+        self._known = False              # horn position unknown until the first command
+        self._ramp = None                # (start time, angles) while ramping
+        self._deadline = None            # when to detach, None when idle or holding
+        self._arrival = self._since      # estimated arrival of the last command
+        self._futures = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"servo-{pin}", daemon=True)
+        self._thread.start()
+
+    def pulse_width(self, angle):
+        span = self.max_angle - self.min_angle
+        return int(self.min_pulse + (angle - self.min_angle) / span * (self.max_pulse - self.min_pulse))
+
+    def clamp(self, angle):
+        return max(self.min_angle, min(self.max_angle, angle))
+
+    def travel_time(self, start, target):
+        """Seconds from start to target at slew_rate (or along the ramp), plus settle"""
+        seconds = abs(target - start) / self.slew_rate
+        if self.ramp:
+            ramp = ramp_profile(target - start, self.ramp_speed, self.ramp_accel)
+            seconds = max(seconds, len(ramp) * SERVO_TICK)
+        return seconds + self.settle
+
+    def angle_now(self):
+        """Estimated horn angle, following the slew model"""
+        with self._cond:
+            return self._estimate(self._now())
+
+    def moving(self):
+        """True until the last commanded move should have arrived (and settled)"""
+        with self._cond:
+            return self._now() < self._arrival
+
+    def _estimate(self, now):
+        travel = self.slew_rate * max(0.0, now - self._since)
+        if self._sent >= self._from:
+            return min(self._sent, self._from + travel)
+        return max(self._sent, self._from - travel)
+
+    def move_to_async(self, angle):
+        """Send the servo towards angle and return a MotionFuture for its arrival.
+
+        A newer target supersedes this one; the future then completes when
+        the servo reaches the newer target. The value is the final angle.
+        """
+        future = MotionFuture()
+        self._command(angle, future)
+        return future
+
+    def move_to_angle(self, angle):
+        """Move to angle and wait for the estimated travel time (detaching, except on hardware PWM)"""
+        return self.move_to_async(angle).result()
+
+    def hold_angle(self, angle):
+        """Drive to angle and keep the signal on (for jogging); detach() when done"""
+        self._command(angle, None, hold=True)
+
+    def detach(self):
+        """Stop the signal and let the servo rest"""
+        with self._cond:
+            self._detach()
+
+    def _command(self, angle, future, hold=False):
+        angle = self.clamp(angle)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"servo on pin {self.pin} is closed")
+            now = self._now()
+            if future is not None:
+                self._futures.append(future)
+
+            if not self._known:
+                # Nobody knows where the horn is: jump, allowing for the far end of the range
+                start = self.min_angle if angle - self.min_angle > self.max_angle - angle else self.max_angle
+                self._known = True
+                self._from, self._since, self._sent = start, now, angle
+                self.output.write(self.pulse_width(angle))
+                self._ramp = None
+            elif self.ramp:
+                # Ramp on from the last pulse sent, so the pulse never jumps
+                start = self._sent
+                ramp = ramp_profile(angle - start, self.ramp_speed, self.ramp_accel)
+                self._ramp = (now, start + np.sign(angle - start) * ramp)
+            else:
+                start = self._estimate(now)
+                self._send(angle, now)
+                self._ramp = None
+            self.current_angle = angle
+            self._arrival = now + self.travel_time(start, angle)
+            self._deadline = None if hold else self._arrival
+            self._cond.notify()
+
+    def _send(self, angle, now):
+        self._from, self._since, self._sent = self._estimate(now), now, angle
+        self.output.write(self.pulse_width(angle))
+
+    def _arrived(self):
+        """Estimated travel is over: detach, or keep holding where the pulses are steady"""
+        if self.output.holds:
+            self._deadline = None
+            self._finish_futures()
+        else:
+            self._detach()
+
+    def _detach(self):
+        self.output.write(0)
+        now = self._now()
+        # Unpowered, the horn stops about where it had got to
+        self._from = self._sent = self._estimate(now)
+        self._since = now
+        self._ramp = None
+        self._deadline = None
+        self._finish_futures()
+
+    def _finish_futures(self):
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future._finish(self.current_angle)
+
+    def _run(self):
+        with self._cond:
+            while not self._closed:
+                now = self._now()
+                if self._ramp is not None:
+                    started, angles = self._ramp
+                    index = int((now - started) / SERVO_TICK)
+                    if index >= len(angles) - 1:
+                        self._send(float(angles[-1]), now)
+                        self._ramp = None
+                    else:
+                        if angles[index] != self._sent:
+                            self._send(float(angles[index]), now)
+                        self._cond.wait((started + (index + 1) * SERVO_TICK - now) / self._speed)
+                    continue
+                if self._deadline is None:
+                    self._cond.wait()
+                    continue
+                remaining = self._deadline - now
+                if remaining > 0:
+                    self._cond.wait(remaining / self._speed)
+                    continue
+                self._arrived()
+
+    def settings(self):
+        """Per-servo calibration kept in the driver config file"""
+        return {'slew_rate': self.slew_rate, 'settle': self.settle}
+
+    def apply_settings(self, settings):
+        self.slew_rate = float(settings.get('slew_rate', self.slew_rate))
+        self.settle = float(settings.get('settle', self.settle))
+
+    def close(self):
+        """Stop the servo signal and the controller thread"""
+        with self._cond:
+            self._closed = True
+            self._detach()
+            self._cond.notify()
+        self._thread.join(1)
+        self.output.close()
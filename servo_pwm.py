@@ -0,0 +1,159 @@
+import os
+import time
+
+# Servo pulses from the kernel PWM driver (/sys/class/pwm) instead of
+# lgpio.tx_servo. The pulse is timed by the SoC's PWM block, so it does not
+# jitter under CPU load and the servo can keep holding its angle without
+# buzzing. Needs the PWM overlay in /boot/config.txt, e.g.
+#
+#   dtoverlay=pwm-2chan,pin=12,func=4,pin2=13,func2=4
+#
+# which routes the two PWM channels to GPIO 12 and 13 (or 18 and 19 with
+# the overlay defaults). Use fake_pwm_sysfs.FakePwmSysfs as root to try it
+# off the Pi.
+#
+# Rewiring: on all three rigs every PWM-capable pin already carries a
+# stepper line (12/13 are MotorY enable/dir in pi4_auto.py and manual.py,
+# 13 is MotorX dir in automatic.py, 18/19 are step pins everywhere). Before
+# SERVO_BACKEND=sysfs can be used, move the stepper lines off one pin of
+# each channel (12 or 18 for channel 0, 13 or 19 for channel 1) to free
+# GPIOs, update the motor pins and STEPPER_PINS in the app, and put the pan
+# and tilt servos on the freed pins.
+
+SYSFS_PWM_ROOT = '/sys/class/pwm'
+
+# BCM pin -> PWM channel on the Pi's PWM block
+PWM_CHANNELS = {12: 0, 18: 0, 13: 1, 19: 1}
+
+# 50 Hz servo frame, in ns as sysfs wants it
+SERVO_PERIOD_NS = 20_000_000
+
+# The channel directory appears on export, but udev may need a moment to
+# hand its files to the gpio group
+EXPORT_TIMEOUT = 2.0
+
+
+class LgpioServoOutput:
+    """Servo pulses from lgpio.tx_servo; width 0 turns the signal off"""
+    holds = False  # software-timed pulses buzz, so the servo is detached after each move
+
+    def __init__(self, gpio, handle, pin):
+        self.gpio = gpio
+        self.h = handle
+        self.pin = pin
+
+    def write(self, pulse_width):
+        self.gpio.tx_servo(self.h, self.pin, pulse_width)
+
+    def close(self):
+        pass  # the pin and chip handle belong to the app
+
+
+class SysfsPwmOutput:
+    """Servo pulses from a kernel PWM channel; width 0 disables the channel"""
+    holds = True  # hardware pulses are steady, so the servo keeps holding torque
+
+    def __init__(self, pin, chip=0, root=SYSFS_PWM_ROOT, period_ns=SERVO_PERIOD_NS,
+                 export_timeout=EXPORT_TIMEOUT):
+        if pin not in PWM_CHANNELS:
+            raise ValueError(f"GPIO {pin} has no hardware PWM; use one of {sorted(PWM_CHANNELS)}")
+        self.pin = pin
+        self.channel = PWM_CHANNELS[pin]
+        self.chip_dir = os.path.join(root, f'pwmchip{chip}')
+        self.dir = os.path.join(self.chip_dir, f'pwm{self.channel}')
+        if not os.path.isdir(self.chip_dir):
+            raise OSError(f"{self.chip_dir} not found; is the PWM overlay enabled?")
+
+        self._exported = not os.path.isdir(self.dir)
+        if self._exported:
+            self._write_file(os.path.join(self.chip_dir, 'export'), self.channel)
+        enable = os.path.join(self.dir, 'enable')
+        deadline = time.monotonic() + export_timeout
+        while not (os.path.exists(enable) and os.access(enable, os.W_OK)):
+            if time.monotonic() > deadline:
+                raise OSError(f"PWM channel {self.dir} did not become writable")
+            time.sleep(0.01)
+
+        # duty_cycle may not exceed period, so clear it before setting the period
+        self._attr('enable', 0)
+        self._attr('duty_cycle', 0)
+        self._attr('period', period_ns)
+        self.enabled = False
+
+    @staticmethod
+    def _write_file(path, value):
+        with open(path, 'w') as f:
+            f.write(str(value))
+
+    def _attr(self, name, value):
+        self._write_file(os.path.join(self.dir, name), value)
+
+    def write(self, pulse_width):
+        """Set the pulse width in us, like tx_servo"""
+        if pulse_width <= 0:
+            if self.enabled:
+                self._attr('enable', 0)
+                self.enabled = False
+            return
+        self._attr('duty_cycle', int(pulse_width * 1000))
+        if not self.enabled:
+            self._attr('enable', 1)
+            self.enabled = True
+
+    def close(self):
+        """Disable the channel and unexport it if we exported it"""
+        self.write(0)
+        if self._exported:
+            self._write_file(os.path.join(self.chip_dir, 'unexport'), self.channel)
+            self._exported = False
+
+
+def check_pwm_pins(pins, reserved=()):
+    """Raise ValueError unless pins are PWM-capable, on separate channels and not in reserved"""
+    channels = {}
+    for pin in pins:
+        if pin not in PWM_CHANNELS:
+            raise ValueError(f"GPIO {pin} has no hardware PWM; use one of {sorted(PWM_CHANNELS)}")
+        if pin in reserved:
+            raise ValueError(f"GPIO {pin} is wired to a stepper; rewire before using it for a servo")
+        channel = PWM_CHANNELS[pin]
+        if channel in channels:
+            raise ValueError(f"GPIO {channels[channel]} and {pin} share PWM channel {channel}")
+        channels[channel] = pin
+
+
+def servo_backend_from_env(pins, reserved=()):
+    """(backend, pins) for the apps' pan/tilt servos.
+
+    SERVO_BACKEND=sysfs switches to kernel PWM; the servos must then be
+    rewired to PWM pins given as SERVO_PWM_PINS (e.g. 12,13), which are
+    checked against reserved (the app's stepper pins) and against each
+    other. Otherwise the lgpio backend is used on pins.
+    """
+    backend = os.environ.get('SERVO_BACKEND', 'lgpio')
+    if backend == 'lgpio':
+        return backend, tuple(pins)
+    if backend != 'sysfs':
+        raise ValueError("SERVO_BACKEND must be 'lgpio' or 'sysfs'")
+    value = os.environ.get('SERVO_PWM_PINS')
+    if not value:
+        raise ValueError("SERVO_BACKEND=sysfs needs SERVO_PWM_PINS (see servo_pwm.py for the rewiring)")
+    pwm_pins = tuple(int(p) for p in value.split(','))
+    if len(pwm_pins) != len(pins):
+        raise ValueError(f"SERVO_PWM_PINS needs {len(pins)} pins")
+    check_pwm_pins(pwm_pins, reserved)
+    return backend, pwm_pins
+
+
+def setup_servo_pins(gpio, handle, pins, stepper_pins):
+    """servo_backend_from_env for an app, claiming the servo pins on lgpio.
+
+    stepper_pins is every pin the app's stepper drivers use (keep it in step
+    with their wiring). On sysfs the PWM driver owns the pins, so nothing is
+    claimed. Returns (backend, pins).
+    """
+    backend, pins = servo_backend_from_env(pins, reserved=stepper_pins)
+    if backend == 'lgpio':
+        for pin in pins:
+            gpio.gpio_claim_output(handle, pin)
+    return backend, pins
@@ -0,0 +1,334 @@
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+from recording_lgpio import RecordingLgpio
+
+# Kinematic gantry simulator behind the lgpio API.
+# With GANTRY_SIM=1 the apps call install_from_env() before importing lgpio,
+# and every `import lgpio` gets a SimLgpio instead, so the motion, tracking
+# and capture code runs on any Linux box.
+#
+# Steppers are found from the way LgpioBackend claims its pins: the step pin
+# on its own, then one group of dir, enable and mode pins on the same chip
+# handle. Each step pulse moves the simulated motor by its microstep size,
+# unless the motor is disabled or the recent full-step rate is above
+# max_step_rate, in which case the step is missed. Servos appear on their
+# first tx_servo and slew towards the commanded angle at servo_slew deg/s.
+# Pulse widths map to angles as configure_servo() says (StableServo passes
+# its own range), or 500-2500 us to 0-180 deg by default.
+#
+# Time is a virtual clock running GANTRY_SIM_SPEED times faster than the
+# host clock. The drivers pace their pulses through sim.sleep(), and pulses
+# are stamped at their paced times, so a sped-up simulation sees the step
+# rates the drivers asked for rather than the host's sleep overshoot.
+#
+#   GANTRY_SIM=1 GANTRY_SIM_SPEED=4 python pi4_auto.py
+
+SIM_ENV = 'GANTRY_SIM'
+
+# 1/32 microsteps per full step; simulated positions are counted in these
+POSITION_UNITS = 32
+
+# A gap this long between pulses means the motor came to rest
+REST_GAP = 0.05
+
+
+class SimClock:
+    """Virtual time running speed times faster than the host clock.
+
+    Each thread also keeps a pacing time that sleep() advances by exactly
+    the requested amount, so pulses are stamped at their commanded spacing
+    even when the host cannot keep up with a sped-up clock. A thread that
+    falls more than REST_GAP behind (it was idle, or badly late) is
+    brought back to now().
+    """
+
+    def __init__(self, speed=1.0):
+        self.speed = speed
+        self._origin = time.perf_counter()
+        self._pacing = threading.local()
+
+    def now(self):
+        return (time.perf_counter() - self._origin) * self.speed
+
+    def stamp(self):
+        """Virtual time of an event on the calling thread"""
+        now = self.now()
+        paced = getattr(self._pacing, 't', None)
+        if paced is None or now - paced > REST_GAP:
+            return now
+        return paced
+
+    def sleep(self, seconds):
+        """Wait until the thread's pacing time, advanced by seconds, comes round"""
+        paced = self.stamp() + max(0.0, seconds)
+        self._pacing.t = paced
+        wait = (paced - self.now()) / self.speed
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SimStepper:
+    def __init__(self, step_pin, dir_pin, enable_pin, mode_pins, max_step_rate, window=4):
+        """max_step_rate: full steps/s above which pulses are missed, averaged over window pulses"""
+        self.step_pin = step_pin
+        self.dir_pin = dir_pin
+        self.enable_pin = enable_pin
+        self.mode_pins = list(mode_pins)
+        self.max_step_rate = max_step_rate
+        self.position = 0      # in 1/POSITION_UNITS full steps
+        self.pulses = 0
+        self.missed = 0
+        self.unpowered = 0     # pulses while the driver was disabled
+        self._last_rise = None
+        self._intervals = deque(maxlen=window)
+        self._train = None     # RecordingLgpio train entry on the step pin
+        self._train_applied = 0
+
+    @property
+    def fullsteps(self):
+        return self.position / POSITION_UNITS
+
+    def divisor(self, levels):
+        from stepper import MicroStep, MicroStepDivisor
+        modes = tuple(levels.get(pin, 0) for pin in self.mode_pins)
+        for stepformat, values in MicroStep.items():
+            if tuple(values[:len(modes)]) == modes:
+                return MicroStepDivisor[stepformat]
+        return 1
+
+    def pulse(self, t, levels):
+        """One rising edge on the step pin at virtual time t"""
+        self.pulses += 1
+        if self._last_rise is not None:
+            gap = t - self._last_rise
+            if gap > REST_GAP:
+                self._intervals.clear()
+            else:
+                self._intervals.append(gap)
+        self._last_rise = t
+
+        if not levels.get(self.enable_pin, 0):
+            self.unpowered += 1
+            return
+        divisor = self.divisor(levels)
+        span = sum(self._intervals)
+        if self._intervals and (span <= 0 or len(self._intervals) / span / divisor > self.max_step_rate):
+            self.missed += 1
+            return
+        sign = -1 if levels.get(self.dir_pin, 0) else 1
+        self.position += sign * (POSITION_UNITS // divisor)
+
+    def start_train(self, train):
+        self._train = train
+        self._train_applied = 0
+
+    def catch_up(self, now, levels):
+        """Apply the pulses of a running tx_pulse train that are due by now"""
+        train = self._train
+        if train is None:
+            return
+        gpio, start, on_us, off_us, cycles = train
+        period = (on_us + off_us) / 1e6
+        due = int((now - start) / period) + 1 if now >= start and period > 0 else 0
+        if cycles:
+            due = min(due, cycles)
+        for i in range(self._train_applied, due):
+            self.pulse(start + i * period, levels)
+        self._train_applied = max(self._train_applied, due)
+        if cycles and self._train_applied >= cycles:
+            self._train = None
+
+    def state(self):
+        return {'position': self.position, 'fullsteps': self.fullsteps,
+                'pulses': self.pulses, 'missed': self.missed, 'unpowered': self.unpowered}
+
+
+class SimServo:
+    def __init__(self, pin, slew, min_angle=0.0, max_angle=180.0, min_pulse=500, max_pulse=2500):
+        """slew in degrees/s; min_pulse/max_pulse (us) drive the horn to min_angle/max_angle.
+        Starts at rest mid range"""
+        self.pin = pin
+        self.slew = slew
+        self.min_angle = min_angle
+        self.max_angle = max_angle
+        self.min_pulse = min_pulse
+        self.max_pulse = max_pulse
+        angle = (min_angle + max_angle) / 2.0
+        self._from = angle
+        self._target = angle
+        self._since = 0.0
+        self.attached = False
+
+    def angle(self, t):
+        """Where the horn is at virtual time t"""
+        travel = self.slew * max(0.0, t - self._since) if self.attached else 0.0
+        if self._target >= self._from:
+            return min(self._target, self._from + travel)
+        return max(self._target, self._from - travel)
+
+    def command(self, t, pulse_width):
+        """tx_servo at t; a width of 0 detaches and the horn rests where it is"""
+        self._from = self.angle(t)
+        self._since = t
+        if pulse_width:
+            angle = self.min_angle + ((pulse_width - self.min_pulse) / (self.max_pulse - self.min_pulse)
+                                      * (self.max_angle - self.min_angle))
+            self._target = max(self.min_angle, min(self.max_angle, angle))
+            self.attached = True
+        else:
+            self._target = self._from
+            self.attached = False
+
+    def state(self, t):
+        return {'angle': self.angle(t), 'target': self._target, 'attached': self.attached}
+
+
+class SimLgpio(RecordingLgpio):
+    simulated = True
+
+    def __init__(self, speed=1.0, max_step_rate=800, servo_slew=350, keep_calls=False):
+        """keep_calls keeps the RecordingLgpio call log (it grows with every write)"""
+        super().__init__(realtime=True)
+        self.clock = SimClock(speed)
+        self.max_step_rate = max_step_rate
+        self.servo_slew = servo_slew
+        self.keep_calls = keep_calls
+        self.steppers = {}      # step pin -> SimStepper
+        self.servos = {}        # pin -> SimServo
+        self.servo_ranges = {}  # pin -> (min_angle, max_angle, min_pulse, max_pulse)
+        self._single_claim = {}  # handle -> last gpio claimed on its own
+        self._lock = threading.RLock()
+
+    def _now(self):
+        return self.clock.now()
+
+    def sleep(self, seconds):
+        self.clock.sleep(seconds)
+
+    def _record(self, name, *args):
+        if self.keep_calls:
+            return super()._record(name, *args)
+        return self._now()
+
+    def _catch_up(self, now):
+        for sim in self.steppers.values():
+            sim.catch_up(now, self.levels)
+
+    def gpiochip_open(self, chip):
+        with self._lock:
+            return super().gpiochip_open(chip)
+
+    def gpio_claim_output(self, handle, gpio, level=0, lFlags=0):
+        with self._lock:
+            self._single_claim[handle] = gpio
+            return super().gpio_claim_output(handle, gpio, level, lFlags)
+
+    def group_claim_output(self, handle, gpios, levels=None, lFlags=0):
+        with self._lock:
+            step_pin = self._single_claim.pop(handle, None)
+            if step_pin is not None and len(gpios) >= 2:
+                self.steppers[step_pin] = SimStepper(step_pin, gpios[0], gpios[1], gpios[2:],
+                                                     self.max_step_rate)
+            return super().group_claim_output(handle, gpios, levels, lFlags)
+
+    def gpio_write(self, handle, gpio, level):
+        with self._lock:
+            self._catch_up(self._now())
+            rising = level and not self.levels.get(gpio, 0)
+            super().gpio_write(handle, gpio, level)
+            if rising and gpio in self.steppers:
+                self.steppers[gpio].pulse(self.clock.stamp(), self.levels)
+            return 0
+
+    def group_write(self, handle, gpio, group_bits, group_mask=-1):
+        with self._lock:
+            self._catch_up(self._now())
+            return super().group_write(handle, gpio, group_bits, group_mask)
+
+    def tx_pulse(self, handle, gpio, pulse_on, pulse_off, pulse_offset=0, pulse_cycles=0):
+        with self._lock:
+            sim = self.steppers.get(gpio)
+            if sim is not None:
+                # Apply what the old train did before the new request cuts it
+                sim.catch_up(self._now(), self.levels)
+            count = len(self.trains)
+            super().tx_pulse(handle, gpio, pulse_on, pulse_off, pulse_offset, pulse_cycles)
+            if sim is not None:
+                sim.start_train(self.trains[-1] if len(self.trains) > count else None)
+            return 0
+
+    def configure_servo(self, gpio, min_angle, max_angle, min_pulse, max_pulse):
+        """Pulse-to-angle mapping of the servo on gpio (not part of the lgpio API)"""
+        with self._lock:
+            self.servo_ranges[gpio] = (min_angle, max_angle, min_pulse, max_pulse)
+            self.servos.pop(gpio, None)  # comes back with the new range on its next pulse
+
+    def tx_servo(self, handle, gpio, pulse_width, servo_frequency=50, pulse_offset=0, pulse_cycles=0):
+        with self._lock:
+            servo = self.servos.get(gpio)
+            if servo is None:
+                servo = self.servos[gpio] = SimServo(gpio, self.servo_slew,
+                                                     *self.servo_ranges.get(gpio, ()))
+            servo.command(self._now(), pulse_width)
+            return super().tx_servo(handle, gpio, pulse_width, servo_frequency, pulse_offset, pulse_cycles)
+
+    def tx_busy(self, handle, gpio, kind):
+        with self._lock:
+            self._catch_up(self._now())
+            return super().tx_busy(handle, gpio, kind)
+
+    def state(self):
+        """{'time', 'steppers': {step pin: ...}, 'servos': {pin: ...}} at the current virtual time"""
+        with self._lock:
+            now = self._now()
+            self._catch_up(now)
+            return {
+                'time': now,
+                'steppers': {pin: sim.state() for pin, sim in self.steppers.items()},
+                'servos': {pin: servo.state(now) for pin, servo in self.servos.items()},
+            }
+
+    def report(self):
+        state = self.state()
+        print(f"Gantry simulator after {state['time']:.2f}s virtual time:")
+        for pin, s in state['steppers'].items():
+            print(f"  stepper on pin {pin}: {s['fullsteps']:.2f} full steps, "
+                  f"{s['pulses']} pulses, {s['missed']} missed, {s['unpowered']} while disabled")
+        for pin, s in state['servos'].items():
+            print(f"  servo on pin {pin}: {s['angle']:.1f} deg")
+
+
+def install(sim=None):
+    """Make `import lgpio` return sim (default: a new SimLgpio); returns it"""
+    if sim is None:
+        sim = SimLgpio()
+    sys.modules['lgpio'] = sim
+    return sim
+
+
+def install_from_env():
+    """install() when GANTRY_SIM=1, with settings from the environment; else None.
+
+    GANTRY_SIM_SPEED (virtual seconds per host second), GANTRY_SIM_MAX_RATE
+    (full steps/s) and GANTRY_SIM_SERVO_SLEW (deg/s) override the defaults.
+    Prints the simulator state at exit.
+    """
+    if os.environ.get(SIM_ENV) != '1':
+        return None
+    sim = install(SimLgpio(
+        speed=float(os.environ.get('GANTRY_SIM_SPEED', 1.0)),
+        max_step_rate=float(os.environ.get('GANTRY_SIM_MAX_RATE', 800)),
+        servo_slew=float(os.environ.get('GANTRY_SIM_SERVO_SLEW', 350))))
+    print(f"lgpio is simulated ({SIM_ENV}=1), running at {sim.clock.speed:g}x")
+    atexit.register(sim.report)
+    return sim
+
+
+def installed():
+    """True when `import lgpio` gives the simulator"""
+    return getattr(sys.modules.get('lgpio'), 'simulated', False)
@@ -0,0 +1,129 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from recording_lgpio import RecordingLgpio
+from stepper import StepperDriver
+
+# Step pulse benchmark for the GPIO backends.
+# Runs TurnStep at each stepdelay the apps use and timestamps every
+# digital_write, then reports the achieved step rate, how far the step
+# periods stray from the target (mean and p99) and how many GPIO library
+# calls - one ioctl each with lgpio - every step costs. Prints JSON so runs
+# can be compared between backends and over time.
+#
+#   python step_benchmark.py --output bench.json
+
+STEPDELAYS = [0.005, 0.002, 0.001]
+
+# MotorX wiring from pi4_auto.py
+PINS = {'dir_pin': 24, 'step_pin': 18, 'enable_pin': 25, 'mode_pins': (21, 22, 5)}
+
+
+def lgpio_module():
+    """Real lgpio when it can open a gpiochip, else the recording stand-in"""
+    try:
+        import lgpio
+        h = lgpio.gpiochip_open(0)
+        lgpio.gpiochip_close(h)
+        return lgpio, 'lgpio'
+    except Exception:
+        return RecordingLgpio(), 'recording'
+
+
+def gpiozero_module():
+    """gpiozero on a MockFactory, or None when gpiozero is not installed"""
+    try:
+        import gpiozero
+        from gpiozero.pins.mock import MockFactory
+    except ImportError:
+        return None
+    gpiozero.Device.pin_factory = MockFactory()
+    return gpiozero
+
+
+def timestamp_writes(driver):
+    """Record (time, pin, value) after every digital_write the driver makes"""
+    stamps = []
+    write = driver.digital_write
+
+    def digital_write(pin, value):
+        write(pin, value)
+        stamps.append((time.perf_counter(), pin, value))
+
+    driver.digital_write = digital_write
+    return stamps
+
+
+def measure(driver, stepdelay, steps):
+    stamps = timestamp_writes(driver)
+    driver.backend.reset_stats()
+    start = time.perf_counter()
+    driver.TurnStep('forward', steps, stepdelay)
+    elapsed = time.perf_counter() - start
+    del driver.digital_write
+
+    rises = np.array([t for t, pin, value in stamps if pin == driver.step_pin and value])
+    periods = np.diff(rises)
+    jitter = np.abs(periods - 2 * stepdelay)
+    return {
+        'stepdelay': stepdelay,
+        'steps': steps,
+        'target_rate': 1.0 / (2 * stepdelay),
+        'rate': (len(periods) / (rises[-1] - rises[0])) if len(periods) else 0.0,
+        'elapsed': elapsed,
+        'period_mean': float(periods.mean()) if len(periods) else 0.0,
+        'jitter_mean': float(jitter.mean()) if len(periods) else 0.0,
+        'jitter_p99': float(np.percentile(jitter, 99)) if len(periods) else 0.0,
+        'syscalls_per_step': driver.backend.writes_issued / steps,
+    }
+
+
+def run(backends=('lgpio', 'gpiozero'), stepdelays=STEPDELAYS, steps=200):
+    results = []
+    for backend in backends:
+        if backend == 'lgpio':
+            gpio, source = lgpio_module()
+        else:
+            gpio, source = gpiozero_module(), 'MockFactory'
+            if gpio is None:
+                results.append({'backend': backend, 'skipped': 'gpiozero is not installed'})
+                continue
+
+        driver = StepperDriver(backend=backend, gpio=gpio, **PINS)
+        try:
+            for stepdelay in stepdelays:
+                results.append(dict(backend=backend, gpio=source, **measure(driver, stepdelay, steps)))
+        finally:
+            driver.cleanup()
+    return {
+        'python': sys.version.split()[0],
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Step pulse jitter and throughput benchmark")
+    parser.add_argument('--backend', action='append', choices=['lgpio', 'gpiozero'],
+                        help="backend to run (repeatable, default: both)")
+    parser.add_argument('--stepdelay', action='append', type=float,
+                        help=f"stepdelay in seconds (repeatable, default: {STEPDELAYS})")
+    parser.add_argument('--steps', type=int, default=200, help="steps per run")
+    parser.add_argument('--output', help="also write the JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args.backend or ('lgpio', 'gpiozero'), args.stepdelay or STEPDELAYS, args.steps)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,728 @@
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+
+import motion_profile
+import motion_thread
+import sim_lgpio
+from position_journal import PositionJournal
+
+# One stepper driver for DRV8825/HR8825 boards with pluggable GPIO backends.
+# Every backend keeps a shadow of its output levels and skips writes that
+# would not change a line (repeated SetMicroStep, enable, dir).
+#   'lgpio'     - dir/enable/mode pins claimed as one lgpio group, so a
+#                 direction change or microstep change is one group_write
+#   'gpiozero'  - gpiozero LED objects, one call per pin
+#   'simulated' - lgpio backend on a RecordingLgpio, for use off the Pi
+# With the gantry simulator installed (sim_lgpio, GANTRY_SIM=1) 'gpiozero'
+# falls back to 'lgpio', and pulses are paced by the simulator's clock.
+
+log = logging.getLogger(__name__)
+
+MotorDir = ['forward', 'backward']
+
+ControlMode = ['hardward', 'softward']
+
+# Microsteps per full step for each mode
+MicroStepDivisor = {
+    'fullstep': 1,
+    'halfstep': 2,
+    '1/4step': 4,
+    '1/8step': 8,
+    '1/16step': 16,
+    '1/32step': 32
+}
+
+MicroStep = {
+    'fullstep': (0, 0, 0),
+    'halfstep': (1, 0, 0),
+    '1/4step': (0, 1, 0),
+    '1/8step': (1, 1, 0),
+    '1/16step': (0, 0, 1),
+    '1/32step': (1, 0, 1)
+}
+
+# Rate of the extra steps that take up backlash when no stepdelay is given
+BACKLASH_STEPDELAY = 0.001
+
+
+class ShadowedOutputs:
+    """Shadow copy of every claimed output; writes that change nothing are dropped.
+
+    Subclasses implement _write(pin, value) and _write_group(levels) for the
+    lines that really change. writes_issued/writes_elided count calls that
+    reached the GPIO library and calls that were skipped.
+    """
+
+    def _init_shadow(self, pins, level=0):
+        self.levels = {pin: level for pin in pins}
+        self.writes_issued = 0
+        self.writes_elided = 0
+        # The emergency stop writes from whichever thread triggers it
+        self._shadow_lock = threading.Lock()
+
+    def write(self, pin, value):
+        value = 1 if value else 0
+        with self._shadow_lock:
+            if self.levels.get(pin) == value:
+                self.writes_elided += 1
+                return
+            self._write(pin, value)
+            self.levels[pin] = value
+            self.writes_issued += 1
+
+    def write_group(self, levels):
+        with self._shadow_lock:
+            changed = {}
+            for pin, value in levels.items():
+                value = 1 if value else 0
+                if self.levels.get(pin) != value:
+                    changed[pin] = value
+            if not changed:
+                self.writes_elided += 1
+                return
+            self._write_group(changed)
+            self.levels.update(changed)
+            self.writes_issued += 1
+
+    def forget(self, pin):
+        """Mark pin's level unknown, e.g. while something else drives it"""
+        with self._shadow_lock:
+            self.levels.pop(pin, None)
+
+    def stats(self):
+        return {'writes_issued': self.writes_issued, 'writes_elided': self.writes_elided}
+
+    def reset_stats(self):
+        self.writes_issued = 0
+        self.writes_elided = 0
+
+    def sleep(self, seconds):
+        """Wait between step edges; a simulated GPIO module can supply its own clock"""
+        time.sleep(seconds)
+
+    def now(self):
+        """Seconds on the same clock as sleep(), for timing moves"""
+        return time.perf_counter()
+
+
+class LgpioBackend(ShadowedOutputs):
+    name = 'lgpio'
+
+    def __init__(self, step_pin, group_pins, gpio=None, chip=0):
+        """Claim step_pin on its own and group_pins as one output group"""
+        if gpio is None:
+            import lgpio as gpio
+        self.gpio = gpio
+        if getattr(gpio, 'simulated', False):
+            self.sleep = gpio.sleep
+            self.now = gpio.clock.now
+        self.h = gpio.gpiochip_open(chip)
+        self.step_pin = step_pin
+        self.group_pins = list(group_pins)
+        self.bit = {pin: 1 << i for i, pin in enumerate(self.group_pins)}
+
+        # Both claims drive every pin LOW
+        gpio.gpio_claim_output(self.h, step_pin, 0)
+        gpio.group_claim_output(self.h, self.group_pins, [0] * len(self.group_pins))
+        self._init_shadow([step_pin] + self.group_pins)
+
+    def _write(self, pin, value):
+        if pin in self.bit:
+            self._write_group({pin: value})
+        else:
+            self.gpio.gpio_write(self.h, pin, value)
+
+    def _write_group(self, levels):
+        """Set several group pins with a single group_write"""
+        bits = mask = 0
+        for pin, value in levels.items():
+            mask |= self.bit[pin]
+            if value:
+                bits |= self.bit[pin]
+        self.gpio.group_write(self.h, self.group_pins[0], bits, mask)
+
+    def start_train(self, stepdelay, steps):
+        half_period_us = max(1, int(round(stepdelay * 1e6)))
+        self.forget(self.step_pin)
+        self.gpio.tx_pulse(self.h, self.step_pin, half_period_us, half_period_us, 0, steps)
+
+    def busy(self):
+        return self.gpio.tx_busy(self.h, self.step_pin, self.gpio.TX_PWM) > 0
+
+    def wait_train(self, timeout=None, poll=0.001):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.busy():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self.sleep(poll)
+        return True
+
+    def cancel_train(self):
+        self.gpio.tx_pulse(self.h, self.step_pin, 0, 0)
+        self.forget(self.step_pin)
+        self.write(self.step_pin, 0)
+
+    def close(self):
+        self.gpio.gpiochip_close(self.h)
+
+
+class GpiozeroBackend(ShadowedOutputs):
+    name = 'gpiozero'
+
+    def __init__(self, step_pin, group_pins, gpio=None):
+        """gpio is the gpiozero module, or a stand-in providing LED"""
+        if gpio is None:
+            import gpiozero as gpio
+        self.step_pin = step_pin
+        self.leds = {pin: gpio.LED(pin) for pin in [step_pin] + list(group_pins)}
+        self._train = None
+        self._init_shadow(self.leds)  # LEDs start off
+
+    def _write(self, pin, value):
+        if value:
+            self.leds[pin].on()
+        else:
+            self.leds[pin].off()
+
+    def _write_group(self, levels):
+        # gpiozero has no grouped write
+        for pin, value in levels.items():
+            self._write(pin, value)
+
+    def start_train(self, stepdelay, steps):
+        """gpiozero has no tx_pulse; run LED.blink(n=steps) on a background thread"""
+        self.wait_train()
+        self.forget(self.step_pin)
+        self._train = threading.Thread(
+            target=self.leds[self.step_pin].blink,
+            kwargs={'on_time': stepdelay, 'off_time': stepdelay, 'n': steps, 'background': False},
+            daemon=True
+        )
+        self._train.start()
+
+    def busy(self):
+        return self._train is not None and self._train.is_alive()
+
+    def wait_train(self, timeout=None):
+        if self._train is None:
+            return True
+        self._train.join(timeout)
+        return not self._train.is_alive()
+
+    def cancel_train(self):
+        self.forget(self.step_pin)
+        self.write(self.step_pin, 0)  # off() also cancels a running blink
+        self.wait_train()
+
+    def close(self):
+        for led in self.leds.values():
+            led.close()
+
+
+class SimulatedBackend(LgpioBackend):
+    name = 'simulated'
+
+    def __init__(self, step_pin, group_pins, gpio=None, chip=0):
+        if gpio is None:
+            from recording_lgpio import RecordingLgpio
+            gpio = RecordingLgpio()
+        super().__init__(step_pin, group_pins, gpio, chip)
+
+
+BACKENDS = {
+    'lgpio': LgpioBackend,
+    'gpiozero': GpiozeroBackend,
+    'simulated': SimulatedBackend,
+}
+
+
+def make_backend(backend, step_pin, group_pins, gpio=None):
+    """Build a backend from its name, or pass an already built one through"""
+    if not isinstance(backend, str):
+        return backend
+    if backend == 'gpiozero' and gpio is None and sim_lgpio.installed():
+        backend = 'lgpio'  # the gantry simulator only stands in for lgpio
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {list(BACKENDS)}")
+    return BACKENDS[backend](step_pin, group_pins, gpio)
+
+
+class EmergencyStop:
+    """Process-wide emergency stop for every StepperDriver.
+
+    trigger() drops every enable line straight from the calling thread, so
+    the motors are de-energised within one GPIO write each, and cancels the
+    running and queued moves, which stop at their next step pulse. New moves
+    are refused until reset().
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._drivers = weakref.WeakSet()
+
+    def register(self, driver):
+        self._drivers.add(driver)
+
+    @property
+    def active(self):
+        return self._event.is_set()
+
+    def trigger(self):
+        """Stop everything; returns the seconds it took to drop all enable lines"""
+        start = time.perf_counter()
+        self._event.set()
+        drivers = list(self._drivers)
+        for driver in drivers:
+            driver.Stop()
+        latency = time.perf_counter() - start
+        for driver in drivers:
+            driver.halt()
+        log.warning("Emergency stop: %d drivers disabled in %.2f ms", len(drivers), latency * 1000)
+        return latency
+
+    def reset(self):
+        """Allow moves again"""
+        self._event.clear()
+
+
+estop = EmergencyStop()
+
+
+class StepperDriver:
+    # DRV8825 boards were disabled after every TurnStep; HR8825 kept holding
+    disable_after_move = True
+
+    def __init__(self, dir_pin, step_pin, enable_pin, mode_pins, backend='lgpio',
+                 min_position=None, max_position=None, gpio=None):
+        self.dir_pin = dir_pin
+        self.step_pin = step_pin
+        self.enable_pin = enable_pin
+        self.mode_pins = list(mode_pins) if isinstance(mode_pins, (list, tuple)) else [mode_pins]
+
+        self.backend = make_backend(backend, step_pin, [dir_pin, enable_pin] + self.mode_pins, gpio)
+
+        # Signed step count since start/calibration, and this motor's move queue
+        self.current_position = 0
+        self.set_soft_limits(min_position, max_position)
+        self.motion = motion_thread.MotionThread(f"stepper-{self.step_pin}")
+
+        # Last mode written to the mode pins, and the auto gear-shift setup
+        self.microstep = None
+        self.gears = None
+
+        # Optional on-disk position journal, see attach_journal()
+        self.journal = None
+        self.needs_homing = False
+
+        # Lost motion on a direction reversal, in position units, and the
+        # direction of the last move (+1/-1, 0 when not known yet)
+        self.backlash = 0
+        self.last_direction = 0
+
+        # A TurnStepTrain started but not yet seen finished
+        self._train_running = False
+
+        estop.register(self)
+
+    def digital_write(self, pin, value):
+        self.backend.write(pin, value)
+
+    def Stop(self):
+        """Disable the motor"""
+        self.digital_write(self.enable_pin, 0)
+
+    def Configure_mode(self, microstep):
+        """Write one level per mode pin in a single grouped write"""
+        self.backend.write_group(dict(zip(self.mode_pins, microstep)))
+
+    def SetMicroStep(self, mode, stepformat):
+        """
+        Set microstepping mode
+        (1) mode: 'hardward' (DIP switches) or 'softward' (mode pins)
+        (2) stepformat: 'fullstep', 'halfstep', '1/4step', '1/8step', '1/16step', '1/32step'
+        """
+        if mode == ControlMode[1]:
+            values = MicroStep.get(stepformat)
+            if values and len(values) == len(self.mode_pins):
+                self.Configure_mode(values)
+                self.microstep = stepformat
+            else:
+                print("Invalid step format or mode pin count mismatch.")
+
+    def _enable_direction(self, Dir):
+        """Enable the driver and set the dir pin together; False for an unknown Dir"""
+        if Dir == MotorDir[0]:  # forward
+            self.backend.write_group({self.enable_pin: 1, self.dir_pin: 0})
+        elif Dir == MotorDir[1]:  # backward
+            self.backend.write_group({self.enable_pin: 1, self.dir_pin: 1})
+        else:
+            print("Direction must be 'forward' or 'backward'")
+            self.digital_write(self.enable_pin, 0)
+            return False
+        return True
+
+    def TurnStep(self, Dir, steps, stepdelay=0.005, cancel=None):
+        """Turn motor steps with direction; returns the steps actually taken"""
+        self._check_estop()
+        if not self._enable_direction(Dir):
+            return 0
+
+        log.debug("Moving %s %d steps with %ss delay between steps", Dir, steps, stepdelay)
+        taken = self._run_steps(steps, stepdelay, cancel=cancel)
+
+        if self.disable_after_move or estop.active:
+            self.Stop()
+        return taken
+
+    def TurnStepProfile(self, Dir, steps, max_speed=motion_profile.DEFAULT_MAX_SPEED,
+                        accel=motion_profile.DEFAULT_ACCEL, shape='trapezoid', cancel=None):
+        """Turn motor steps along an accelerate/cruise/decelerate profile.
+
+        max_speed is in steps/s and accel in steps/s^2; shape is
+        'trapezoid' or 'scurve'. Short moves never reach max_speed.
+        Returns the steps actually taken.
+        """
+        self._check_estop()
+        if not self._enable_direction(Dir):
+            return 0
+
+        taken = self._run_steps(steps, max_speed=max_speed, accel=accel, shape=shape, cancel=cancel)
+
+        if self.disable_after_move or estop.active:
+            self.Stop()
+        return taken
+
+    def _run_steps(self, steps, stepdelay=None, cancel=None, **profile):
+        """Pulse the step pin at a fixed stepdelay, or along a motion profile.
+
+        Stops early when cancel (a CancelToken) or the emergency stop fires;
+        returns the steps taken.
+        """
+        if stepdelay is None:
+            return motion_profile.run_intervals(self, motion_profile.plan_intervals(steps, **profile),
+                                                lambda: self._should_stop(cancel))
+        for taken in range(steps):
+            if self._should_stop(cancel):
+                return taken
+            self.digital_write(self.step_pin, 1)
+            self.backend.sleep(stepdelay)
+            self.digital_write(self.step_pin, 0)
+            self.backend.sleep(stepdelay)
+        return steps
+
+    def _should_stop(self, cancel=None):
+        return estop.active or (cancel is not None and cancel.cancelled)
+
+    def _check_estop(self):
+        if estop.active:
+            raise RuntimeError("Emergency stop is active; reset it before moving")
+
+    def halt(self):
+        """Disable the motor now and cancel the running and queued moves"""
+        self.Stop()
+        self.motion.cancel_all()
+        self.StopTrain()
+
+    def TurnStepTrain(self, Dir, steps, stepdelay=0.005):
+        """Queue the whole move as a backend pulse train and return immediately.
+
+        With lgpio the step edges are timed by lgpio itself, so the period
+        does not depend on Python sleeps. Poll is_busy() or call
+        wait_done() for completion; the motor stays enabled until Stop().
+
+        The train is bookkept like move(): soft limits and backlash apply,
+        current_position is the train's end point as soon as it starts, and
+        the journal stays dirty until the train is seen finished. With auto
+        microstepping the train runs in the position unit. A train cut short
+        by StopTrain() sets needs_homing, as the pulses sent are not known.
+        """
+        self._check_estop()
+        self._check_train_idle()
+        if not self._enable_direction(Dir):
+            return False
+
+        sign = 1 if Dir == MotorDir[0] else -1
+        steps = abs(self.clamp_position(self.current_position + sign * max(0, steps)) - self.current_position)
+        # A zero-length train would mean "run forever" to lgpio and gpiozero
+        if steps == 0:
+            return True
+
+        if self.gears is not None:
+            self.SetMicroStep(ControlMode[1], self.gears[0])
+        self._journal_begin()
+        self.take_up_backlash(sign)
+        self.backend.start_train(stepdelay, steps)
+        self.current_position += sign * steps
+        self._train_running = True
+        return True
+
+    def is_busy(self):
+        """True while a queued pulse train is still running"""
+        if self.backend.busy():
+            return True
+        self._train_finished()
+        return False
+
+    def wait_done(self, timeout=None):
+        """Block until the pulse train finishes; False if timeout expires first"""
+        if not self.backend.wait_train(timeout):
+            return False
+        self._train_finished()
+        return True
+
+    def StopTrain(self):
+        """Cancel any queued pulse train on the step pin"""
+        if self._train_running and self.backend.busy():
+            self._train_running = False
+            self.needs_homing = True
+            print(f"Step pin {self.step_pin}: pulse train stopped early, re-home before trusting position")
+        self.backend.cancel_train()
+
+    def _train_finished(self):
+        if self._train_running:
+            self._train_running = False
+            self._journal_end()
+
+    def _check_train_idle(self):
+        if self.is_busy():
+            raise RuntimeError("A pulse train is still running; wait_done() or StopTrain() first")
+
+    def move(self, steps, stepdelay=None, cancel=None, **profile):
+        """Signed relative move (positive = forward); updates current_position.
+
+        With stepdelay the move runs at that fixed rate like TurnStep,
+        otherwise along a motion profile with the given profile arguments.
+        With auto microstepping on, steps are in the position unit and the
+        move is split into gears by plan_gears(). A cancelled move (cancel
+        token or emergency stop) ends at its next pulse and current_position
+        counts only the steps taken. Raises RuntimeError while a
+        TurnStepTrain is still running.
+        """
+        self._check_estop()
+        self._check_train_idle()
+        steps = self.clamp_position(self.current_position + steps) - self.current_position
+        if steps == 0 or self._should_stop(cancel):
+            return self.current_position
+        Dir = MotorDir[0] if steps > 0 else MotorDir[1]
+        if not self._enable_direction(Dir):
+            return self.current_position
+
+        log.debug("Moving %s %d steps", Dir, abs(steps))
+        sign = 1 if steps > 0 else -1
+        self._journal_begin()
+        self.take_up_backlash(sign, stepdelay, cancel)
+        for stepformat, count in self.plan_gears(steps):
+            if count:
+                if stepformat is not None:
+                    self.SetMicroStep(ControlMode[1], stepformat)
+                taken = self._run_steps(count, stepdelay, cancel=cancel, **profile)
+                self.current_position += sign * taken * self.units_per_step(stepformat)
+                if taken < count:
+                    log.debug("Move cancelled after %d of %d steps", taken, count)
+                    break
+        self._journal_end()
+
+        if self.disable_after_move or estop.active:
+            self.Stop()
+        return self.current_position
+
+    def set_auto_microstep(self, coarse='halfstep', unit='1/8step', fine_steps=200):
+        """Shift microstep mode per move: coarse for long travel, unit near the target.
+
+        Positions stay counted in unit microsteps whichever mode is in use.
+        Needs the mode pins under software control ('softward'); pass
+        coarse=None to switch shifting off and stay in unit.
+        """
+        if coarse is None:
+            self.gears = None
+            return
+        if MicroStepDivisor[coarse] >= MicroStepDivisor[unit]:
+            raise ValueError("coarse mode must have fewer microsteps than unit")
+        self.gears = (unit, coarse, fine_steps)
+        self.SetMicroStep(ControlMode[1], unit)
+
+    def plan_gears(self, steps, position=None):
+        """Split a signed move into [(mode, count)] for align, coarse and fine phases.
+
+        Counts are in steps of that phase's mode. The align phase brings the
+        position onto a coarse-step boundary so the coarse steps land
+        exactly; the last fine_steps unit steps are always taken in unit.
+        Without auto microstepping, mode is None and all steps are one phase.
+        position is where the move starts (default: current_position).
+        """
+        n = abs(steps)
+        if self.gears is None:
+            return [(None, 0), (None, n), (None, 0)]
+        if position is None:
+            position = self.current_position
+        unit, coarse, fine_steps = self.gears
+        ratio = MicroStepDivisor[unit] // MicroStepDivisor[coarse]
+        align = (-position) % ratio if steps > 0 else position % ratio
+        coarse_steps = max(0, (n - align - fine_steps) // ratio)
+        if coarse_steps == 0:
+            return [(unit, n), (coarse, 0), (unit, 0)]
+        return [(unit, align), (coarse, coarse_steps), (unit, n - align - coarse_steps * ratio)]
+
+    def take_up_backlash(self, direction, stepdelay=None, cancel=None):
+        """Step out the slack before a move in direction (+1/-1) that reverses the last one.
+
+        The extra steps leave current_position alone: they only bring the
+        screw back into contact. Call with the dir pin already set for the
+        move. Runs in unit microsteps at stepdelay (default
+        BACKLASH_STEPDELAY). Returns the steps taken.
+        """
+        reversing = self.last_direction not in (0, direction)
+        self.last_direction = direction
+        if not reversing or self.backlash <= 0:
+            return 0
+        if self.gears is not None:
+            self.SetMicroStep(ControlMode[1], self.gears[0])
+        taken = self._run_steps(self.backlash, stepdelay or BACKLASH_STEPDELAY, cancel=cancel)
+        if taken < self.backlash:
+            self.last_direction = 0  # slack only partly taken up
+        log.debug("Took up %d of %d backlash steps", taken, self.backlash)
+        return taken
+
+    def settings(self):
+        """Per-motor calibration kept in the driver config file"""
+        return {'backlash': self.backlash}
+
+    def apply_settings(self, settings):
+        self.backlash = int(settings.get('backlash', self.backlash))
+
+    def units_per_step(self, stepformat):
+        """Position units one step in stepformat covers (1 without auto microstepping)"""
+        if self.gears is None or stepformat is None:
+            return 1
+        return MicroStepDivisor[self.gears[0]] // MicroStepDivisor[stepformat]
+
+    def move_async(self, steps, **kwargs):
+        """Queue move() on this motor's motion thread; returns a MotionFuture.
+
+        future.cancel() stops the move early.
+        """
+        token = kwargs.setdefault('cancel', motion_thread.CancelToken())
+        future = self.motion.submit(self.move, steps, **kwargs)
+        future.cancel_token = token
+        return future
+
+    def move_to_async(self, position, **kwargs):
+        """Queue a move to an absolute position; the delta is taken when it starts"""
+        token = kwargs.setdefault('cancel', motion_thread.CancelToken())
+        future = self.motion.submit(self.move_to, position, **kwargs)
+        future.cancel_token = token
+        return future
+
+    def move_to(self, target, **kwargs):
+        """Move to an absolute position, stepping only the difference from here"""
+        return self.move(target - self.current_position, **kwargs)
+
+    # pi4_auto.py's name for move_to
+    move_to_position = move_to
+
+    def gpio_stats(self):
+        """GPIO writes issued vs. dropped as redundant by the shadow state"""
+        return self.backend.stats()
+
+    def get_current_position(self):
+        return self.current_position
+
+    def set_position(self, position):
+        """Declare the current position, e.g. 0 after homing; clears needs_homing"""
+        self.current_position = position
+        self.needs_homing = False
+        self._journal_end()
+
+    def attach_journal(self, path):
+        """Persist position and microstep mode to a memory-mapped file at path.
+
+        A journal left clean by the last run restores the position and mode
+        straight away. One left dirty (the process died mid-move) keeps the
+        last settled position as a guess but sets needs_homing, since the
+        motor may have stepped any part of that move. Returns True when the
+        position was restored.
+        """
+        self.journal = PositionJournal(path, list(MicroStep))
+        state = self.journal.load()
+        if state is None:
+            self._journal_end()
+            return False
+        position, microstep, clean = state
+        self.current_position = position
+        if microstep is not None and microstep != self.microstep:
+            self.SetMicroStep(ControlMode[1], microstep)
+        if not clean:
+            self.needs_homing = True
+            print(f"Step pin {self.step_pin}: last move was interrupted, re-home before trusting position {position}")
+        return clean
+
+    def _journal_begin(self):
+        if self.journal is not None:
+            self.journal.begin_move()
+
+    def _journal_end(self):
+        if self.journal is not None:
+            self.journal.end_move(self.current_position, self.microstep)
+
+    def set_soft_limits(self, min_position=None, max_position=None):
+        """Limit moves to [min_position, max_position]; None leaves that side open"""
+        self.min_position = min_position
+        self.max_position = max_position
+
+    def clamp_position(self, target):
+        """Pull target back inside the soft limits, warning if it was outside"""
+        limited = target
+        if self.min_position is not None:
+            limited = max(self.min_position, limited)
+        if self.max_position is not None:
+            limited = min(self.max_position, limited)
+        if limited != target:
+            print(f"Soft limit: step pin {self.step_pin} target {target} clamped to {limited}")
+        return limited
+
+    def cleanup(self):
+        """Cancel outstanding moves, disable the motor and release the pins"""
+        self.motion.cancel_all()
+        self.motion.stop(timeout=1)
+        self.StopTrain()
+        self.Stop()
+        self.backend.close()
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+
+# Per-axis driver settings shared by the apps: stepper backlash (measured by
+# the Calibrate Tracking button) and servo slew_rate/settle (edit the file to
+# tune them)
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stepper_config.json')
+
+
+def save_config(path, drivers):
+    """Write {name: driver} settings (stepper backlash, servo slew) to the JSON driver config at path"""
+    config = load_config(path)
+    for name, driver in drivers.items():
+        config[name] = driver.settings()
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_config(path, drivers=None):
+    """Read the JSON driver config at path; with {name: driver}, apply each entry found.
+
+    Returns the config as a dict, empty when there is no file yet.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        config = json.load(f)
+    for name, driver in (drivers or {}).items():
+        if name in config:
+            driver.apply_settings(config[name])
+    return config
@@ -84,88 +84,6 @@ class ReportServer:
             self.server_thread.join(timeout=1)
             
             
-# Custom DRV8825 class (from your working code)
-
-MotorDir = [
-    'forward',
-    'backward',
-]
-
-ControlMode = [
-    'hardward',
-    'softward',
-]
-class DRV8825:
-    def __init__(self, dir_pin, step_pin, enable_pin, mode_pins):
-        self.dir_pin = dir_pin
-        self.step_pin = step_pin        
-        self.enable_pin = enable_pin
-        self.mode_pins = mode_pins if isinstance(mode_pins, (list, tuple)) else [mode_pins]
-
-        self.h = lgpio.gpiochip_open(0)
-
-        # Claim all pins as outputs
-        lgpio.gpio_claim_output(self.h, self.dir_pin)
-        lgpio.gpio_claim_output(self.h, self.step_pin)
-        lgpio.gpio_claim_output(self.h, self.enable_pin)
-        for pin in self.mode_pins:
-            lgpio.gpio_claim_output(self.h, pin)
-
-    def digital_write(self, pin, value):
-        lgpio.gpio_write(self.h, pin, value)
-
-    def Stop(self):
-        self.digital_write(self.enable_pin, 0)
-
-    def SetMicroStep(self, mode, stepformat):
-        """
-        (1) mode
-            'hardward' : Use DIP switch
-            'softward' : Use GPIOs to control microstepping
-        (2) stepformat: e.g. 'fullstep', 'halfstep', etc.
-        """
-        microstep = {
-            'fullstep': (0, 0, 0),
-            'halfstep': (1, 0, 0),
-            '1/4step': (0, 1, 0),
-            '1/8step': (1, 1, 0),
-            '1/16step': (0, 0, 1),
-            '1/32step': (1, 0, 1)
-        }
-
-        if mode == ControlMode[1]:  # software
-            values = microstep.get(stepformat)
-            if values and len(values) == len(self.mode_pins):
-                for pin, val in zip(self.mode_pins, values):
-                    self.digital_write(pin, val)
-            else:
-                print("Invalid step format or mode pin count mismatch.")
-
-    def TurnStep(self, Dir, steps, stepdelay=0.005):
-        if Dir == MotorDir[0]:  # forward
-            print("turn shaft forward")
-            self.digital_write(self.enable_pin, 1)
-            self.digital_write(self.dir_pin, 0)
-        elif Dir == MotorDir[1]:  # backward
-            print("turn shaft backward")
-            self.digital_write(self.enable_pin, 1)
-            self.digital_write(self.dir_pin, 1)
-        else:
-            print("Direction must be 'forward' or 'backward'")
-            self.digital_write(self.enable_pin, 0)
-            return
-
-        print("turn step:", steps)
-        for _ in range(steps):
-            self.digital_write(self.step_pin, 1)
-            time.sleep(stepdelay)
-            self.digital_write(self.step_pin, 0)
-            time.sleep(stepdelay)
-
-    def cleanup(self):
-        # Optionally disable motor and close chip
-        self.Stop()
-        lgpio.gpiochip_close(self.h)
 # Initialize motor drivers
 MotorX = DRV8825(
     dir_pin=13,     # STEPPER_X_DIR
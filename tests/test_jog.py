@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jog import VelocityJog
+from motion_thread import MotionFuture
+
+
+class ManualThread:
+    """MotionThread stand-in that runs submitted jobs only when told to"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        self.jobs.append((fn, args))
+        return MotionFuture()
+
+    def run_next(self):
+        fn, args = self.jobs.pop(0)
+        fn(*args)
+
+
+class HookLock:
+    """Lock that calls on_release() once, right after the next release"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.on_release = None
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+        hook, self.on_release = self.on_release, None
+        if hook is not None:
+            hook()
+
+
+class RepressedJog(VelocityJog):
+    """Pressed again as soon as its jog has decided to stop"""
+
+    def __init__(self, thread):
+        super().__init__(thread, max_speed=100, accel=100, hold_grace=0)
+        self._lock = HookLock()
+        self.repressed = False
+
+    def _held(self):
+        direction = super()._held()
+        if direction == 0 and not self.repressed:
+            # The next release is the one after the decision to stop
+            self.repressed = True
+            self._lock.on_release = lambda: self.press(1)
+        return direction
+
+    def _step(self, direction, interval, cancel):
+        return True
+
+
+def test_press_while_the_jog_is_stopping_starts_a_new_one():
+    thread = ManualThread()
+    jog = RepressedJog(thread)
+    jog.press(1)
+    jog.release()
+    thread.run_next()
+    assert len(thread.jobs) == 1
+    jog.release()
+    thread.run_next()
+    assert not jog._running
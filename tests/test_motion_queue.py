@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motion_queue import MotionQueue
+
+
+class FakeAxes:
+    """Two-axis actuator that records its moves; the first move blocks until released"""
+
+    def __init__(self):
+        self.position = (0, 0)
+        self.calls = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def _hold(self):
+        self.started.set()
+        self.release.wait(5)
+
+    def move_by(self, delta):
+        self._hold()
+        self.calls.append(('by', delta))
+        self.position = tuple(p + d for p, d in zip(self.position, delta))
+        return self.position
+
+    def move_to(self, target):
+        self._hold()
+        self.calls.append(('to', target))
+        self.position = tuple(p if t is None else t for p, t in zip(self.position, target))
+        return self.position
+
+
+@pytest.fixture
+def axes():
+    axes = FakeAxes()
+    queue = MotionQueue('test', axes.move_by, axes.move_to, lambda: axes.position)
+    # Keep the queue thread busy so the following commands stay pending
+    queue.move_by((5, 7))
+    assert axes.started.wait(5)
+    yield axes, queue
+    axes.release.set()
+    queue.close(5)
+
+
+def test_by_merges_into_partial_target(axes):
+    axes, queue = axes
+    queue.move_to((100, None))
+    future = queue.move_by((3, 4))
+    axes.release.set()
+    assert future.result(5) == (103, 11)
+    assert axes.calls[-1] == ('to', (103, 11))
+
+
+def test_partial_target_keeps_pending_delta(axes):
+    axes, queue = axes
+    queue.move_by((3, 4))
+    future = queue.move_to((100, None))
+    axes.release.set()
+    assert future.result(5) == (100, 11)
+
+
+def test_partial_target_keeps_pending_target_and_delta(axes):
+    axes, queue = axes
+    queue.move_to((None, 50))
+    queue.move_by((2, 1))
+    queue.move_to((10, None))
+    future = queue.move_by((1, 1))
+    axes.release.set()
+    assert future.result(5) == (11, 52)
+    assert queue.stats()['executed'] == 2
+
+
+def test_full_target_supersedes_pending_delta(axes):
+    axes, queue = axes
+    queue.move_by((3, 4))
+    future = queue.move_to((20, 30))
+    axes.release.set()
+    assert future.result(5) == (20, 30)
+
+
+def test_partial_target_needs_position():
+    axes = FakeAxes()
+    queue = MotionQueue('test', axes.move_by, axes.move_to)
+    queue.move_by((1, 1))
+    assert axes.started.wait(5)
+    queue.move_to((100, None))
+    with pytest.raises(ValueError):
+        queue.move_by((3, 4))
+    axes.release.set()
+    queue.close(5)
+
+
+def test_busy_while_running_and_pending(axes):
+    axes, queue = axes
+    assert queue.busy() and queue.depth() == 0  # only the running move
+    queue.move_by((1, 1))
+    assert queue.busy() and queue.depth() == 1
+    future = queue.move_by((1, 1))
+    axes.release.set()
+    future.result(5)
+    assert not queue.busy()
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motion_thread import MotionFuture
+from pose import go_to_pose
+
+
+class FakeRoot:
+    """Stands in for a Tk widget: after() only records the call"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, fn, *args):
+        self.scheduled.append((fn, args))
+
+    def run(self):
+        for fn, args in self.scheduled:
+            fn(*args)
+        self.scheduled = []
+
+
+def test_done_callback_runs_on_the_tk_loop():
+    futures = {'servo_x': MotionFuture(), 'steppers': MotionFuture()}
+    pose = go_to_pose({name: (lambda f=f: f) for name, f in futures.items()})
+    root = FakeRoot()
+    reached = []
+    pose.add_done_callback(reached.append, root=root)
+
+    futures['servo_x']._finish()
+    futures['steppers']._finish()
+    assert pose.done() and reached == []
+    root.run()
+    assert reached == [pose]
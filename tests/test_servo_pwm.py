@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_pwm_sysfs import FakePwmSysfs
+from recording_lgpio import RecordingLgpio
+from servo import StableServo
+from servo_pwm import SysfsPwmOutput, check_pwm_pins
+
+
+@pytest.fixture
+def sysfs():
+    with FakePwmSysfs() as sysfs:
+        yield sysfs
+
+
+def wait_for(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_output_exports_and_sets_period(sysfs):
+    output = SysfsPwmOutput(13, root=sysfs.root)
+    assert sysfs.exports == [(0, 1, 'export')]
+    assert sysfs.state(0, 1) == {'period': 20_000_000, 'duty_cycle': 0, 'enable': 0}
+
+    output.write(1500)
+    assert sysfs.state(0, 1) == {'period': 20_000_000, 'duty_cycle': 1_500_000, 'enable': 1}
+    output.write(0)
+    assert sysfs.state(0, 1)['enable'] == 0
+
+    output.close()
+    assert wait_for(lambda: not sysfs.exported(0, 1))
+    assert sysfs.exports[-1] == (0, 1, 'unexport')
+
+
+def test_output_leaves_a_channel_it_did_not_export(sysfs):
+    first = SysfsPwmOutput(12, root=sysfs.root)
+    second = SysfsPwmOutput(12, root=sysfs.root)
+    second.close()
+    time.sleep(0.05)
+    assert sysfs.exported(0, 0)
+    first.close()
+    assert wait_for(lambda: not sysfs.exported(0, 0))
+
+
+def test_pins_checked(sysfs):
+    with pytest.raises(ValueError):
+        SysfsPwmOutput(17, root=sysfs.root)
+    with pytest.raises(ValueError):
+        check_pwm_pins((12, 18))  # both on channel 0
+    with pytest.raises(ValueError):
+        check_pwm_pins((12, 13), reserved=(13,))
+    check_pwm_pins((18, 13))
+
+
+def test_sysfs_servo_keeps_holding(sysfs):
+    servo = StableServo(12, None, backend='sysfs', pwm_root=sysfs.root, slew_rate=10000, settle=0)
+    servo.move_to_angle(45)
+    assert not servo.moving()
+    # Still driven after arrival: 45 of 0..180 degrees is a 1000 us pulse
+    assert sysfs.state(0, 0) == {'period': 20_000_000, 'duty_cycle': 1_000_000, 'enable': 1}
+    servo.detach()
+    assert sysfs.state(0, 0)['enable'] == 0
+    servo.close()
+
+
+def test_lgpio_servo_detaches():
+    gpio = RecordingLgpio()
+    servo = StableServo(17, 0, gpio=gpio, slew_rate=10000, settle=0)
+    servo.move_to_angle(45)
+    widths = [args[2] for _, name, args in gpio.calls if name == 'tx_servo']
+    assert widths == [1000, 0]
+    servo.close()
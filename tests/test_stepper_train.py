@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DRV8825 import DRV8825
+from position_journal import PositionJournal
+from recording_lgpio import RecordingLgpio
+from stepper import MicroStep
+
+
+@pytest.fixture
+def motor():
+    gpio = RecordingLgpio()
+    motor = DRV8825(dir_pin=13, step_pin=19, enable_pin=12, mode_pins=(16, 5, 20), gpio=gpio)
+    yield motor, gpio
+    motor.cleanup()
+
+
+def test_train_step_period(motor):
+    motor, gpio = motor
+    assert motor.TurnStepTrain('forward', 20, stepdelay=0.0005)
+    assert motor.wait_done(1)
+    periods = gpio.step_periods(19)
+    assert len(periods) == 19
+    assert all(period == pytest.approx(0.001) for period in periods)
+
+
+def test_train_is_bookkept(motor, tmp_path):
+    motor, gpio = motor
+    journal = str(tmp_path / 'x.journal')
+    motor.attach_journal(journal)
+    motor.TurnStepTrain('backward', 30, stepdelay=0.0005)
+    assert motor.current_position == -30 and motor.last_direction == -1
+    with pytest.raises(RuntimeError):
+        motor.move(5)
+    assert motor.wait_done(1)
+    assert PositionJournal(journal, list(MicroStep)).load()[::2] == (-30, True)
+    assert motor.move(5, stepdelay=0.0001) == -25
+
+
+def test_train_takes_up_backlash_and_limits(motor):
+    motor, gpio = motor
+    motor.backlash = 3
+    motor.set_soft_limits(max_position=10)
+    motor.move(-1, stepdelay=0.0001)
+    gpio.reset()
+    motor.TurnStepTrain('forward', 50, stepdelay=0.0001)
+    motor.wait_done(1)
+    writes = [call for call in gpio.calls if call[1] == 'gpio_write' and call[2][1] == 19]
+    assert len(writes) == 2 * 3  # backlash steps before the train
+    assert gpio.trains[-1][4] == 11
+    assert motor.current_position == 10
+
+
+def test_stopped_train_needs_homing(motor):
+    motor, gpio = motor
+    motor.TurnStepTrain('forward', 1000, stepdelay=0.001)
+    motor.StopTrain()
+    assert motor.needs_homing
+    assert motor.wait_done(1)
+    assert motor.move(1, stepdelay=0.0001) == 1001
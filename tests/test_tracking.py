@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tracking
+from motion_queue import MotionQueue
+
+
+class FakeMotor:
+    def __init__(self):
+        self.current_position = 0
+
+
+class FakeServo:
+    """Servo whose moves block until released"""
+
+    def __init__(self, release):
+        self.current_angle = 90.0
+        self.release = release
+        self.moves = []
+
+    def clamp(self, angle):
+        return max(0.0, min(180.0, angle))
+
+    def moving(self):
+        return False
+
+    def angle_now(self):
+        return self.current_angle
+
+    def move_to_angle(self, angle):
+        self.release.wait(5)
+        self.moves.append(angle)
+        self.current_angle = angle
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    release = threading.Event()
+    motor_x, motor_y = FakeMotor(), FakeMotor()
+    tracker = tracking.Tracker(motor_x, motor_y, FakeServo(release), FakeServo(release),
+                               str(tmp_path / 'jacobian.json'), str(tmp_path / 'config.json'))
+    moves = []
+
+    def move_to(target, stepdelay):
+        release.wait(5)
+        moves.append(target)
+        motor_x.current_position, motor_y.current_position = target
+        return target
+
+    tracker.stepper_queue.close()
+    tracker.stepper_queue = MotionQueue('steppers', None, move_to, tracker.stepper_position)
+    yield tracker, release, moves
+    release.set()
+    tracker.close()
+
+
+def test_no_correction_while_queues_busy(tracker):
+    tracker, release, moves = tracker
+    assert tracker.adjust(50, -30) == {'x': 89.0, 'y': 91.0}
+    # Frames seen during those moves are stale
+    assert tracker.adjust(50, -30) == {}
+    assert tracker.stepper_queue.stats()['submitted'] == 1
+    assert tracker.servo_x_queue.stats()['submitted'] == 1
+    release.set()
+    tracker.stepper_queue.close(5)
+    tracker.servo_x_queue.close(5)
+    assert moves == [(-10, 6)]
+    assert tracker.servo_x.moves == [89.0]
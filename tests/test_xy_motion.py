@@ -0,0 +1,36 @@
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import xy_motion
+from DRV8825 import DRV8825
+from recording_lgpio import RecordingLgpio
+
+
+def make_pair():
+    gpio = RecordingLgpio()
+    motor_x = DRV8825(dir_pin=13, step_pin=19, enable_pin=12, mode_pins=(16, 5, 20), gpio=gpio)
+    motor_y = DRV8825(dir_pin=24, step_pin=18, enable_pin=4, mode_pins=(21, 22, 27), gpio=gpio)
+    return motor_x, motor_y
+
+
+def test_concurrent_coordinated_moves_do_not_deadlock():
+    motor_x, motor_y = make_pair()
+    futures = [[], []]
+
+    def submit(out):
+        for _ in range(200):
+            out.append(xy_motion.move_xy_async(motor_x, motor_y, 1, 1, stepdelay=0.00001))
+
+    threads = [threading.Thread(target=submit, args=(out,)) for out in futures]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for future in futures[0] + futures[1]:
+        assert future.wait(10)
+    assert (motor_x.current_position, motor_y.current_position) == (400, 400)
+    motor_x.cleanup()
+    motor_y.cleanup()
@@ -0,0 +1,201 @@
+import os
+import threading
+
+import stepper
+import visual_jacobian
+import xy_motion
+from motion_queue import MotionQueue
+
+# Face tracking for the rigs with two steppers and pan/tilt servos
+# (pi4_auto.py and automatic.py).
+# Face offsets are taken out by the steppers and the finer mouth offsets by
+# the servos. Corrections go through MotionQueues, and an axis takes no new
+# correction while its queue is busy: a frame seen mid-move measures an
+# offset the running move is already taking out. With a measured image
+# Jacobian (calibrate()) one least-squares solve per frame gives the moves;
+# without one, fixed gains are used.
+
+# Measured pixels per step/degree, written by Tracker.calibrate()
+JACOBIAN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tracking_jacobian.json')
+
+# Offsets (pixels) left alone: face, mouth
+DEADBAND = 20
+FINE_DEADBAND = 10
+
+# Fixed gains without a calibration: pixels of offset per stepper step, and
+# degrees a servo is nudged per frame (half that for the mouth)
+PIXELS_PER_STEP = 5
+SERVO_NUDGE = 1.0
+
+# Step delay of the tracking corrections (face, mouth)
+TRACKING_STEPDELAY = 0.002
+FINE_STEPDELAY = 0.001
+
+# Calibration probes: stepper position units, servo degrees
+STEPPER_PROBE = 200
+SERVO_PROBE = 3
+
+
+def grab_frame(cap, flush=3):
+    """Read a fresh frame from cap, dropping the ones buffered while motors moved"""
+    for _ in range(flush):
+        cap.read()
+    ret, frame = cap.read()
+    if not ret:
+        raise RuntimeError("Failed to read a frame from the camera")
+    return frame
+
+
+class Tracker:
+    def __init__(self, motor_x, motor_y, servo_x, servo_y, jacobian_file=JACOBIAN_FILE,
+                 config_file=stepper.CONFIG_FILE):
+        """config_file is the driver config (stepper.save_config) that gets the measured backlash"""
+        self.motor_x = motor_x
+        self.motor_y = motor_y
+        self.servo_x = servo_x
+        self.servo_y = servo_y
+        self.jacobian_file = jacobian_file
+        self.config_file = config_file
+
+        self.stepper_queue = MotionQueue('steppers', self.move_xy_by, self.move_xy_to, self.stepper_position)
+        self.servo_x_queue = MotionQueue('servo-x', lambda d: servo_x.move_to_angle(servo_x.current_angle + d),
+                                         servo_x.move_to_angle)
+        self.servo_y_queue = MotionQueue('servo-y', lambda d: servo_y.move_to_angle(servo_y.current_angle + d),
+                                         servo_y.move_to_angle)
+
+        # Image Jacobian from calibrate(); None keeps the fixed gains
+        self.jacobian = visual_jacobian.ImageJacobian.load(jacobian_file)
+        # True while the calibration thread owns the camera and motors
+        self.calibrating = False
+
+    def stepper_position(self):
+        return self.motor_x.current_position, self.motor_y.current_position
+
+    def move_xy_to(self, target, stepdelay=TRACKING_STEPDELAY):
+        """Coordinated correction to absolute (x, y); None leaves an axis alone"""
+        x = self.motor_x.current_position if target[0] is None else target[0]
+        y = self.motor_y.current_position if target[1] is None else target[1]
+        position = xy_motion.move_xy_to_async(self.motor_x, self.motor_y, x, y, stepdelay=stepdelay).result()
+        self.motor_x.motion.submit(self.motor_x.Stop)
+        self.motor_y.motion.submit(self.motor_y.Stop)
+        return position
+
+    def move_xy_by(self, delta, stepdelay=TRACKING_STEPDELAY):
+        """Relative form of move_xy_to, for merged queue commands"""
+        x, y = self.stepper_position()
+        return self.move_xy_to((x + delta[0], y + delta[1]), stepdelay)
+
+    def _servos(self):
+        return (('x', self.servo_x, self.servo_x_queue), ('y', self.servo_y, self.servo_y_queue))
+
+    def adjust(self, offset_x, offset_y, fine_tune=False):
+        """Correct for a face (or, with fine_tune, mouth) offset from the frame centre.
+
+        Returns {axis: new angle} for the servos it moved.
+        """
+        if self.calibrating:
+            return {}
+        axis_set = 'servos' if fine_tune else 'steppers'
+        if self.jacobian is not None and axis_set in self.jacobian:
+            return self._adjust_calibrated(axis_set, offset_x, offset_y, fine_tune)
+
+        deadband = FINE_DEADBAND if fine_tune else DEADBAND
+        nudge = SERVO_NUDGE * (0.5 if fine_tune else 1.0)
+        angles = {}
+        steps = {}
+        for (axis, servo, queue), offset in zip(self._servos(), (offset_x, offset_y)):
+            if abs(offset) <= deadband:
+                continue
+            count = int(abs(offset) / PIXELS_PER_STEP)
+            steps[axis] = count if offset < 0 else -count
+            # A nudge on top of one still travelling would overshoot
+            if servo.moving() or queue.busy():
+                continue
+            angles[axis] = servo.clamp(servo.current_angle + (-nudge if offset > 0 else nudge))
+            queue.move_to(angles[axis])
+
+        # One coordinated correction so both axes finish together
+        self._move_steppers(steps.get('x', 0), steps.get('y', 0),
+                            FINE_STEPDELAY if fine_tune else TRACKING_STEPDELAY)
+        return angles
+
+    def _adjust_calibrated(self, axis_set, offset_x, offset_y, fine_tune):
+        """One-shot correction through the measured image Jacobian"""
+        if max(abs(offset_x), abs(offset_y)) <= (FINE_DEADBAND if fine_tune else DEADBAND):
+            return {}
+        moves = self.jacobian.solve(axis_set, offset_x, offset_y)
+
+        angles = {}
+        if axis_set == 'servos':
+            for axis, servo, queue in self._servos():
+                delta = moves['servo_' + axis]
+                # The offset was seen from wherever the horn was when the frame
+                # was taken, so no new correction until the last one has landed
+                if abs(delta) < 0.1 or servo.moving() or queue.busy():
+                    continue
+                angles[axis] = servo.clamp(servo.angle_now() + delta)
+                queue.move_to(angles[axis])
+            return angles
+
+        self._move_steppers(int(round(moves['stepper_x'])), int(round(moves['stepper_y'])),
+                            TRACKING_STEPDELAY)
+        return angles
+
+    def _move_steppers(self, steps_x, steps_y, stepdelay):
+        # Targets are absolute from where the gantry is now, which is only
+        # known once the last correction has finished; until then the frame
+        # was taken mid-move and its offset is stale
+        if (steps_x or steps_y) and not self.stepper_queue.busy():
+            self.stepper_queue.move_to(
+                (self.motor_x.current_position + steps_x if steps_x else None,
+                 self.motor_y.current_position + steps_y if steps_y else None),
+                stepdelay=stepdelay
+            )
+
+    def calibrate(self, grab_frame, done):
+        """Measure stepper backlash, then probe every stepper and servo axis for the image Jacobian.
+
+        Runs on a worker thread, so the UI keeps running; tracking
+        corrections are ignored meanwhile. done(error) is called from that
+        thread when it finishes, with None on success. Returns False if a
+        calibration is already running.
+        """
+        if self.calibrating:
+            return False
+        self.calibrating = True
+        threading.Thread(target=self._calibrate, args=(grab_frame, done),
+                         name='calibrate-tracking', daemon=True).start()
+        return True
+
+    def _calibrate(self, grab_frame, done):
+        error = None
+        try:
+            # Backlash first, so the Jacobian probes below are compensated
+            for axis, motor, (ux, uy) in (('x', self.motor_x, (1, 0)), ('y', self.motor_y, (0, 1))):
+                motor.backlash = 0
+                motor.backlash = visual_jacobian.measure_backlash(
+                    grab_frame,
+                    lambda d, ux=ux, uy=uy: self.stepper_queue.move_by((d * ux, d * uy)).result(),
+                    STEPPER_PROBE)
+                print(f"stepper_{axis}: backlash {motor.backlash} units")
+            stepper.save_config(self.config_file, {'x': self.motor_x, 'y': self.motor_y,
+                                                   'servo_x': self.servo_x, 'servo_y': self.servo_y})
+
+            self.jacobian = visual_jacobian.calibrate(grab_frame, [
+                ('steppers', 'stepper_x', lambda d: self.stepper_queue.move_by((d, 0)).result(), STEPPER_PROBE),
+                ('steppers', 'stepper_y', lambda d: self.stepper_queue.move_by((0, d)).result(), STEPPER_PROBE),
+                ('servos', 'servo_x', lambda d: self.servo_x_queue.move_by(d).result(), SERVO_PROBE),
+                ('servos', 'servo_y', lambda d: self.servo_y_queue.move_by(d).result(), SERVO_PROBE),
+            ])
+            self.jacobian.save(self.jacobian_file)
+        except Exception as e:
+            error = e
+        finally:
+            self.calibrating = False
+        done(error)
+
+    def close(self):
+        """Stop the queues and report how much they coalesced"""
+        for queue in (self.stepper_queue, self.servo_x_queue, self.servo_y_queue):
+            print(f"{queue.name} queue: {queue.stats()}")
+            queue.close(timeout=1)
@@ -0,0 +1,129 @@
+import json
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Image Jacobian for visual tracking.
+# Each column says how far (in pixels) the scene moves in the camera image
+# for one unit of an actuator: a position unit for a stepper, a degree for
+# a servo. A tracking offset is turned into actuator moves with one
+# least-squares solve instead of a fixed pixels-per-step guess.
+
+
+def _gray(frame):
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return np.float32(frame)
+
+
+def measure_shift(before, after):
+    """Return (dx, dy, response): how far the scene moved from before to after, in pixels.
+
+    Uses phase correlation over the whole frame; response is the
+    correlation peak (near 1 for a clean shift, near 0 for none found).
+    """
+    a = _gray(before)
+    b = _gray(after)
+    window = cv2.createHanningWindow((a.shape[1], a.shape[0]), cv2.CV_32F)
+    (dx, dy), response = cv2.phaseCorrelate(a, b, window)
+    return dx, dy, response
+
+
+class ImageJacobian:
+    def __init__(self, axis_sets=None):
+        """axis_sets: {set name: (actuator names, 2xN pixels-per-unit matrix)}"""
+        self.axis_sets = {}
+        for name, (axes, matrix) in (axis_sets or {}).items():
+            self.set(name, axes, matrix)
+
+    def set(self, name, axes, matrix):
+        self.axis_sets[name] = (list(axes), np.asarray(matrix, dtype=float).reshape(2, len(axes)))
+
+    def __contains__(self, name):
+        return name in self.axis_sets
+
+    def solve(self, name, offset_x, offset_y):
+        """Moves of the named axis set that bring a point offset from centre back to centre.
+
+        Returns {actuator: delta}, the least-squares solution through the
+        pseudo-inverse, so a badly conditioned axis does not blow up.
+        """
+        axes, matrix = self.axis_sets[name]
+        deltas = np.linalg.pinv(matrix) @ np.array([-offset_x, -offset_y], dtype=float)
+        return dict(zip(axes, deltas.tolist()))
+
+    def save(self, path):
+        data = {name: {'axes': axes, 'matrix': matrix.tolist()}
+                for name, (axes, matrix) in self.axis_sets.items()}
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved calibration; None if there is none yet"""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls({name: (entry['axes'], entry['matrix']) for name, entry in data.items()})
+
+
+def calibrate(grab_frame, actuators, settle=0.3, min_response=0.1):
+    """Probe each actuator with a small known move and measure the image shift.
+
+    grab_frame() returns a fresh camera frame. actuators is a list of
+    (set name, actuator name, move(delta), probe delta) where move blocks
+    until the actuator has arrived. Every actuator is moved by +probe and
+    back by -probe and the two measurements are averaged, so it ends where
+    it started. Returns an ImageJacobian with one 2xN matrix per set.
+    """
+    columns = {}
+    for set_name, name, move, probe in actuators:
+        shifts = []
+        for delta in (probe, -probe):
+            before = grab_frame()
+            move(delta)
+            time.sleep(settle)
+            dx, dy, response = measure_shift(before, grab_frame())
+            if response < min_response:
+                raise RuntimeError(f"{name}: no image shift found (response {response:.2f})")
+            shifts.append((dx / delta, dy / delta))
+        column = np.mean(shifts, axis=0)
+        print(f"{name}: {column[0]:.3f}, {column[1]:.3f} px per unit")
+        columns.setdefault(set_name, []).append((name, column))
+
+    jacobian = ImageJacobian()
+    for set_name, entries in columns.items():
+        jacobian.set(set_name, [name for name, column in entries],
+                     np.column_stack([column for name, column in entries]))
+    return jacobian
+
+
+def measure_backlash(grab_frame, move, probe, settle=0.3, min_response=0.1):
+    """Measure a stepper's lost motion on direction reversal from the camera image.
+
+    move(delta) moves the stepper (with its own backlash compensation off)
+    and blocks until it has arrived. After a -probe preload the stepper goes
+    +probe (reversal), +probe (same direction) and -probe (reversal), ending
+    where it started. The same-direction shift is the full-motion reference;
+    the reversals come up short by the backlash. Returns it in the stepper's
+    position units.
+    """
+    move(-probe)
+    time.sleep(settle)
+    shifts = []
+    for delta in (probe, probe, -probe):
+        before = grab_frame()
+        move(delta)
+        time.sleep(settle)
+        dx, dy, response = measure_shift(before, grab_frame())
+        if response < min_response:
+            raise RuntimeError(f"no image shift found (response {response:.2f})")
+        shifts.append(math.hypot(dx, dy))
+    reversal, same = (shifts[0] + shifts[2]) / 2.0, shifts[1]
+    if same == 0:
+        raise RuntimeError("stepper did not move the image")
+    return max(0, int(round(probe * (1.0 - reversal / same))))
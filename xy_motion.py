@@ -0,0 +1,183 @@
+import threading
+
+import numpy as np
+
+import motion_profile
+import motion_thread
+
+# Coordinated two-axis moves.
+# The axis with more steps sets the pace and the other axis is stepped on
+# the same ticks Bresenham-style, so both finish together and a diagonal
+# takes as long as its longer leg instead of the sum of both.
+
+
+def _direction(steps):
+    return 'forward' if steps > 0 else 'backward'
+
+
+def move_xy(motor_x, motor_y, dx, dy, stepdelay=None, phases=None, cancel=None, **profile):
+    """Move both motors by (dx, dy) steps with interleaved pulses.
+
+    Works with any StepperDriver (DRV8825 or HR8825); the deltas are
+    clipped to each soft limit. With stepdelay the major axis runs at that
+    fixed rate, otherwise it follows motion_profile.plan_intervals() with
+    the profile arguments. Motors with auto microstepping shift gears
+    together: the align, coarse and fine phases each run as their own
+    coordinated move. phases is a ready plan_xy() result for exactly this
+    move, e.g. from preset_plans. A motor that reverses direction first
+    takes up its backlash on its own. A cancelled move (cancel token or
+    emergency stop) ends at its next tick and the positions count only the
+    steps taken. Returns the new (x, y) position.
+    """
+    motor_x._check_estop()
+    dx = motor_x.clamp_position(motor_x.current_position + dx) - motor_x.current_position
+    dy = motor_y.clamp_position(motor_y.current_position + dy) - motor_y.current_position
+    if (dx == 0 and dy == 0) or motor_x._should_stop(cancel):
+        return motor_x.current_position, motor_y.current_position
+
+    for motor, delta in ((motor_x, dx), (motor_y, dy)):
+        if delta != 0 and not motor._enable_direction(_direction(delta)):
+            return motor_x.current_position, motor_y.current_position
+
+    if phases is None:
+        phases = plan_xy(motor_x, motor_y, dx, dy, stepdelay, **profile)
+    for motor, delta in ((motor_x, dx), (motor_y, dy)):
+        motor._journal_begin()
+        if delta != 0:
+            motor.take_up_backlash(1 if delta > 0 else -1, stepdelay, cancel)
+    taken_x, taken_y = run_plan(motor_x, motor_y, phases, lambda: motor_x._should_stop(cancel))
+
+    motor_x.current_position += taken_x if dx > 0 else -taken_x
+    motor_y.current_position += taken_y if dy > 0 else -taken_y
+    for motor in (motor_x, motor_y):
+        motor._journal_end()
+        if motor._should_stop():  # emergency stop
+            motor.Stop()
+    return motor_x.current_position, motor_y.current_position
+
+
+def plan_xy(motor_x, motor_y, dx, dy, stepdelay=None, start=None, **profile):
+    """Plan a coordinated move as phases of (mode_x, mode_y, intervals, masks).
+
+    start is the (x, y) the move begins at (default: where the motors are).
+    intervals holds the tick-to-tick times and masks one entry per tick,
+    bit 0 set when X steps and bit 1 when Y steps. A mode is None when that
+    motor keeps its current mode for the phase.
+    """
+    if start is None:
+        start = (motor_x.current_position, motor_y.current_position)
+    phases = []
+    for (mode_x, nx), (mode_y, ny) in zip(motor_x.plan_gears(dx, start[0]), motor_y.plan_gears(dy, start[1])):
+        major = max(nx, ny)
+        if major == 0:
+            continue
+        if stepdelay is not None:
+            intervals = np.full(major, 2.0 * stepdelay)
+        else:
+            intervals = motion_profile.plan_intervals(major, **profile)
+        masks = _tick_mask(nx, major) | (_tick_mask(ny, major) << 1)
+        phases.append((mode_x if nx else None, mode_y if ny else None, intervals, masks))
+    return phases
+
+
+def _tick_mask(count, major):
+    """1 on the ticks where an axis with count steps steps, Bresenham-style"""
+    # Steps taken after tick k: the error term starts at major // 2, loses
+    # count per tick and gets major back for every step
+    k = np.arange(1, major + 1)
+    taken = np.maximum(0, -((major // 2 - k * count) // major))
+    return (np.diff(taken, prepend=0) > 0).astype(np.uint8)
+
+
+def run_plan(motor_x, motor_y, phases, should_stop=None):
+    """Replay plan_xy() phases; the caller has already set the directions.
+
+    should_stop() is checked before every tick. Returns the distance each
+    motor covered, in position units.
+    """
+    taken_x = taken_y = 0
+    for mode_x, mode_y, intervals, masks in phases:
+        for motor, mode in ((motor_x, mode_x), (motor_y, mode_y)):
+            if mode is not None:
+                motor.SetMicroStep('softward', mode)
+        ticks = _interleave((motor_x, motor_y), intervals, masks, should_stop)
+        done = masks[:ticks]
+        taken_x += int(np.count_nonzero(done & 1)) * motor_x.units_per_step(mode_x)
+        taken_y += int(np.count_nonzero(done & 2)) * motor_y.units_per_step(mode_y)
+        if ticks < len(masks):
+            break
+    return taken_x, taken_y
+
+
+def _interleave(motors, intervals, masks, should_stop=None):
+    """Pulse motors[i] on every tick whose mask has bit i set; returns the ticks run"""
+    sleep = motors[0].backend.sleep
+    for tick, (interval, mask) in enumerate(zip(intervals.tolist(), masks.tolist())):
+        if should_stop is not None and should_stop():
+            return tick
+        stepping = [motor for bit, motor in enumerate(motors) if mask & (1 << bit)]
+        half = interval / 2.0
+        for motor in stepping:
+            motor.digital_write(motor.step_pin, 1)
+        sleep(half)
+        for motor in stepping:
+            motor.digital_write(motor.step_pin, 0)
+        sleep(half)
+    return len(masks)
+
+
+def move_xy_async(motor_x, motor_y, dx, dy, **kwargs):
+    """Queue a coordinated move; returns a MotionFuture for the (x, y) result.
+
+    The move runs on motor_x's motion thread while motor_y's thread is held
+    at the same point in its queue, so neither axis is driven by anything
+    else until the coordinated move is done. future.cancel() stops it early.
+    """
+    token = kwargs.setdefault('cancel', motion_thread.CancelToken())
+    return _submit(motor_x, motor_y, lambda: move_xy(motor_x, motor_y, dx, dy, **kwargs), token)
+
+
+def move_xy_to_async(motor_x, motor_y, x, y, plans=None, **kwargs):
+    """Queue a coordinated move to absolute (x, y); deltas are taken when it starts.
+
+    plans (a preset_plans.PresetPlans) supplies a precomputed plan when
+    the move starts and ends on preset positions.
+    """
+    token = kwargs.setdefault('cancel', motion_thread.CancelToken())
+
+    def move():
+        start = (motor_x.current_position, motor_y.current_position)
+        phases = plans.lookup(start, (x, y)) if plans is not None else None
+        return move_xy(motor_x, motor_y, x - start[0], y - start[1], phases=phases, **kwargs)
+
+    return _submit(motor_x, motor_y, move, token)
+
+
+# Held while a coordinated move takes its slots in the two motion queues, so
+# every pair of coordinated moves sits in the same order on both threads;
+# otherwise two submitters could each get one thread first and each thread
+# would wait for the other forever
+_submit_lock = threading.Lock()
+
+
+def _submit(motor_x, motor_y, move, token):
+    """Run move on motor_x's thread while motor_y's is held; either motor's halt() cancels it"""
+    y_ready = threading.Event()
+    finished = threading.Event()
+
+    def hold_y():
+        y_ready.set()
+        finished.wait()
+
+    def run():
+        y_ready.wait()
+        try:
+            return move()
+        finally:
+            finished.set()
+
+    with _submit_lock:
+        motor_y.motion.submit(hold_y).cancel_token = token
+        future = motor_x.motion.submit(run)
+    future.cancel_token = token
+    return future